@@ -633,6 +633,7 @@ def load_arguments(self, _):
 
     with self.argument_context('network dns zone import') as c:
         c.argument('file_name', options_list=['--file-name', '-f'], type=file_type, completer=FilesCompleter(), help='Path to the DNS zone file to import')
+        c.argument('parallelism', type=int, help='Maximum number of record sets to create concurrently. Use 1 to import them one at a time, e.g. on subscriptions close to their request limits.')
 
     with self.argument_context('network dns zone export') as c:
         c.argument('file_name', options_list=['--file-name', '-f'], type=file_type, completer=FilesCompleter(), help='Path to the DNS zone file to save')
@@ -6,20 +6,28 @@
 # pylint: disable=no-self-use, no-member, too-many-lines, unused-argument
 # pylint: disable=protected-access, too-few-public-methods, line-too-long
 
+import sys
 from collections import Counter, OrderedDict
+from functools import lru_cache
+from time import localtime, strftime
+from weakref import WeakKeyDictionary
 
 from msrestazure.tools import parse_resource_id, is_valid_resource_id, resource_id
 
 from knack.log import get_logger
 
-from azure.cli.core.aaz import has_value
+from azure.core.exceptions import AzureError, HttpResponseError
+
+from azure.cli.core.aaz import AAZBoolArg, AAZFileArg, AAZFileArgBase64EncodeFormat, AAZListArg, AAZResourceIdArg, \
+    AAZResourceIdArgFormat, AAZStrArg, has_value
 from azure.cli.core.aaz.utils import assign_aaz_list_arg
 from azure.cli.core.commands import cached_get, cached_put, upsert_to_collection, get_property
 from azure.cli.core.commands.client_factory import get_subscription_id, get_mgmt_service_client
 
 from azure.cli.core.util import CLIError, sdk_no_wait, find_child_item, find_child_collection
 from azure.cli.core.azclierror import InvalidArgumentValueError, RequiredArgumentMissingError, \
-    UnrecognizedArgumentError, ResourceNotFoundError, ArgumentUsageError, MutuallyExclusiveArgumentError
+    UnrecognizedArgumentError, ResourceNotFoundError, ArgumentUsageError, MutuallyExclusiveArgumentError, \
+    FileOperationError, UnclassifiedUserFault
 from azure.cli.core.profiles import ResourceType, supported_api_version
 
 from azure.cli.command_modules.network._client_factory import network_client_factory
@@ -35,6 +43,8 @@ from .aaz.latest.network.application_gateway.ssl_profile import Add as _SSLProfi
 from .aaz.latest.network.application_gateway.url_path_map import Create as _URLPathMapCreate, \
     Update as _URLPathMapUpdate
 from .aaz.latest.network.application_gateway.url_path_map.rule import Create as _URLPathMapRuleCreate
+from .aaz.latest.network.application_gateway.waf_policy import Create as _WAFPolicyCreate, Show as _WAFPolicyShow, \
+    Update as _WAFPolicyUpdate
 from .aaz.latest.network.application_gateway.waf_policy.custom_rule.match_condition import \
     Add as _WAFCustomRuleMatchConditionAdd
 from .aaz.latest.network.express_route import Create as _ExpressRouteCreate, Update as _ExpressRouteUpdate
@@ -67,11 +77,121 @@ logger = get_logger(__name__)
 # region Utility methods
 def _log_pprint_template(template):
     import json
+    import logging
+    # skip serializing the whole template when it would be discarded anyway
+    if not logger.isEnabledFor(logging.INFO):
+        return
     logger.info('==== BEGIN TEMPLATE ====')
-    logger.info(json.dumps(template, indent=2))
+    logger.info('%s', json.dumps(template, indent=2))
     logger.info('==== END TEMPLATE ====')
 
 
+@lru_cache(maxsize=None)
+def _cached_get_models(api_profile, resource_type, operation_group, attr_args):
+    from azure.cli.core.profiles._shared import get_versioned_sdk
+    return get_versioned_sdk(api_profile, resource_type, *attr_args, mod='models', operation_group=operation_group)
+
+
+def _get_models(cmd, *attr_args, **kwargs):
+    """ Same as `cmd.get_models`, but memoized on the active profile, resource type and operation group. """
+    resource_type = kwargs.get('resource_type', cmd.command_kwargs.get('resource_type', None))
+    operation_group = kwargs.get('operation_group', cmd.command_kwargs.get('operation_group', None))
+    return _cached_get_models(cmd.cli_ctx.cloud.profile, resource_type, operation_group, attr_args)
+
+
+@lru_cache(maxsize=None)
+def _cached_supported_api_version(api_profile, resource_type, min_api, max_api, operation_group):
+    from azure.cli.core.profiles._shared import supported_api_version as _sdk_supported_api_version
+    return _sdk_supported_api_version(api_profile, resource_type, min_api=min_api, max_api=max_api,
+                                      operation_group=operation_group)
+
+
+def _supported_api_version(cmd, resource_type=None, min_api=None, max_api=None, operation_group=None):
+    """ Same as `cmd.supported_api_version`, but memoized on the active profile, resource type and operation group. """
+    if not min_api and not max_api:
+        return True
+    resource_type = resource_type or cmd.command_kwargs.get('resource_type', None) or cmd.loader._get_resource_type()
+    return _cached_supported_api_version(cmd.cli_ctx.cloud.profile, resource_type, min_api, max_api, operation_group)
+
+
+_NETWORK_CLIENTS = WeakKeyDictionary()
+
+
+def _cached_network_client(cli_ctx):
+    """ Reuse one network management client (and its connection pool) per `cli_ctx` and subscription. """
+    clients = _NETWORK_CLIENTS.setdefault(cli_ctx, {})
+    subscription_id = cli_ctx.data.get('subscription_id')
+    if subscription_id not in clients:
+        clients[subscription_id] = network_client_factory(cli_ctx)
+    return clients[subscription_id]
+
+
+_DNS_CLIENTS = WeakKeyDictionary()
+
+
+def _cached_dns_client(cli_ctx, subscription_id=None):
+    """ Reuse one DNS management client per `cli_ctx` and subscription. """
+    clients = _DNS_CLIENTS.setdefault(cli_ctx, {})
+    # without an explicit subscription the client is built for the one given with --subscription
+    key = subscription_id or cli_ctx.data.get('subscription_id')
+    if key not in clients:
+        clients[key] = get_mgmt_service_client(cli_ctx, ResourceType.MGMT_NETWORK_DNS,
+                                               subscription_id=subscription_id)
+    return clients[key]
+
+
+def _upsert_in_place(parent, collection_name, obj_to_add, key_name='name'):
+    """ Same as `upsert_to_collection`, but a match is replaced at its position during the one scan of the
+    collection, instead of being removed by equality and appended again. """
+    collection = getattr(parent, collection_name, None)
+    if collection is None:
+        collection = []
+        setattr(parent, collection_name, collection)
+
+    value = getattr(obj_to_add, key_name)
+    if value is None:
+        raise CLIError("Unable to resolve a value for key '{}' with which to match.".format(key_name))
+
+    for i, item in enumerate(collection):
+        if getattr(item, key_name, None) == value:
+            logger.warning("Item '%s' already exists. Replacing with new values.", value)
+            collection[i] = obj_to_add
+            return
+    collection.append(obj_to_add)
+
+
+def _set_if_not_none(instance, **properties):
+    for prop, value in properties.items():
+        if value is not None:
+            setattr(instance, prop, value)
+
+
+def _get_ip_allocation_method(cmd, private_ip_address):
+    IPAllocationMethod = _get_models(cmd, 'IPAllocationMethod')
+    return IPAllocationMethod.static.value if private_ip_address else IPAllocationMethod.dynamic.value
+
+
+def _sub_resource_or_none(cmd, resource_id):
+    return _get_models(cmd, 'SubResource')(id=resource_id) if resource_id else None
+
+
+_AG_CHILD_ID_TEMPLATE = "/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network" \
+                        "/applicationGateways/{gateway_name}/%s/{}"
+
+
+@lru_cache(maxsize=None)
+def _ag_child_fmt(child_type, fmt_cls=AAZResourceIdArgFormat):
+    """ Resource id format for a child of the application gateway named by `gateway_name`, shared across schemas. """
+    return fmt_cls(template=_AG_CHILD_ID_TEMPLATE % child_type)
+
+
+def _get_child_by_name(collection, name, kind):
+    item = next((x for x in collection or [] if x.name == name), None)
+    if item is None:
+        raise ResourceNotFoundError(f"{kind} {name} doesn't exist")
+    return item
+
+
 def _get_default_name(balancer, property_name, option_name):
     return _get_default_value(balancer, property_name, option_name, True)
 
@@ -81,21 +201,24 @@ def _get_default_id(balancer, property_name, option_name):
 
 
 def _get_default_value(balancer, property_name, option_name, return_name):
-    values = [x.id for x in getattr(balancer, property_name)]
-    if len(values) > 1:
-        raise CLIError("Multiple possible values found for '{0}': {1}\nSpecify '{0}' "
-                       "explicitly.".format(option_name, ', '.join(values)))
-    if not values:
+    items = iter(getattr(balancer, property_name))
+    first = next(items, None)
+    if first is None:
         raise CLIError("No existing values found for '{0}'. Create one first and try "
                        "again.".format(option_name))
-    return values[0].rsplit('/', 1)[1] if return_name else values[0]
+    if next(items, None) is not None:
+        values = [x.id for x in getattr(balancer, property_name)]
+        raise CLIError("Multiple possible values found for '{0}': {1}\nSpecify '{0}' "
+                       "explicitly.".format(option_name, ', '.join(values)))
+    value = first.id
+    return value.rsplit('/', 1)[1] if return_name else value
 
 # endregion
 
 
 # region Generic list commands
 def _generic_list(cli_ctx, operation_name, resource_group_name):
-    ncf = network_client_factory(cli_ctx)
+    ncf = _cached_network_client(cli_ctx)
     operation_group = getattr(ncf, operation_name)
     if resource_group_name:
         return operation_group.list(resource_group_name)
@@ -172,13 +295,16 @@ def create_application_gateway(cmd, application_gateway_name, resource_group_nam
     from azure.cli.command_modules.network._template_builder import (
         build_application_gateway_resource, build_public_ip_resource, build_vnet_resource)
 
-    DeploymentProperties = cmd.get_models('DeploymentProperties', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES)
-    IPAllocationMethod = cmd.get_models('IPAllocationMethod')
+    DeploymentProperties = _get_models(cmd, 'DeploymentProperties',
+                                       resource_type=ResourceType.MGMT_RESOURCE_RESOURCES)
+    IPAllocationMethod = _get_models(cmd, 'IPAllocationMethod')
+
+    is_v2_sku = _is_v2_sku(sku)
+    static_allocation, dynamic_allocation = IPAllocationMethod.static.value, IPAllocationMethod.dynamic.value
 
     tags = tags or {}
-    sku_tier = sku.split('_', 1)[0] if not _is_v2_sku(sku) else sku
+    sku_tier = sku.split('_', 1)[0] if not is_v2_sku else sku
     http_listener_protocol = 'https' if (cert_data or key_vault_secret_id) else 'http'
-    private_ip_allocation = 'Static' if private_ip_address else 'Dynamic'
     virtual_network_name = virtual_network_name or '{}Vnet'.format(application_gateway_name)
 
     # Build up the ARM template
@@ -187,12 +313,12 @@ def create_application_gateway(cmd, application_gateway_name, resource_group_nam
 
     public_ip_id = public_ip_address if is_valid_resource_id(public_ip_address) else None
     subnet_id = subnet if is_valid_resource_id(subnet) else None
-    private_ip_allocation = IPAllocationMethod.static.value if private_ip_address \
-        else IPAllocationMethod.dynamic.value
+    private_ip_allocation = static_allocation if private_ip_address else dynamic_allocation
 
     network_id_template = resource_id(
         subscription=get_subscription_id(cmd.cli_ctx), resource_group=resource_group_name,
         namespace='Microsoft.Network')
+    vnet_id = f'{network_id_template}/virtualNetworks/{virtual_network_name}'
 
     if subnet_type == 'new':
         ag_dependencies.append('Microsoft.Network/virtualNetworks/{}'.format(virtual_network_name))
@@ -203,31 +329,26 @@ def create_application_gateway(cmd, application_gateway_name, resource_group_nam
             private_link_subnet=private_link_subnet,
             private_link_subnet_prefix=private_link_subnet_prefix)
         master_template.add_resource(vnet)
-        subnet_id = '{}/virtualNetworks/{}/subnets/{}'.format(network_id_template,
-                                                              virtual_network_name, subnet)
+        subnet_id = f'{vnet_id}/subnets/{subnet}'
 
     if public_ip_address_type == 'new':
         ag_dependencies.append('Microsoft.Network/publicIpAddresses/{}'.format(public_ip_address))
         public_ip_sku = None
-        if _is_v2_sku(sku):
+        if is_v2_sku:
             public_ip_sku = 'Standard'
             public_ip_address_allocation = 'Static'
         master_template.add_resource(build_public_ip_resource(cmd, public_ip_address, location,
                                                               tags,
                                                               public_ip_address_allocation,
                                                               None, public_ip_sku, None))
-        public_ip_id = '{}/publicIPAddresses/{}'.format(network_id_template,
-                                                        public_ip_address)
+        public_ip_id = f'{network_id_template}/publicIPAddresses/{public_ip_address}'
 
     private_link_subnet_id = None
     private_link_name = 'PrivateLinkDefaultConfiguration'
     private_link_ip_allocation_method = 'Dynamic'
     if enable_private_link:
-        private_link_subnet_id = '{}/virtualNetworks/{}/subnets/{}'.format(network_id_template,
-                                                                           virtual_network_name,
-                                                                           private_link_subnet)
-        private_link_ip_allocation_method = IPAllocationMethod.static.value if private_link_ip_address \
-            else IPAllocationMethod.dynamic.value
+        private_link_subnet_id = f'{vnet_id}/subnets/{private_link_subnet}'
+        private_link_ip_allocation_method = static_allocation if private_link_ip_address else dynamic_allocation
 
     app_gateway_resource = build_application_gateway_resource(
         cmd, application_gateway_name, location, tags, sku, sku_tier, capacity, servers, frontend_port,
@@ -257,12 +378,12 @@ def create_application_gateway(cmd, application_gateway_name, resource_group_nam
     deployment_name = 'ag_deploy_' + random_string(32)
     client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES).deployments
     properties = DeploymentProperties(template=template, parameters=parameters, mode='incremental')
-    Deployment = cmd.get_models('Deployment', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES)
+    Deployment = _get_models(cmd, 'Deployment', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES)
     deployment = Deployment(properties=properties)
 
     if validate:
         _log_pprint_template(template)
-        if cmd.supported_api_version(min_api='2019-10-01', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES):
+        if _supported_api_version(cmd, min_api='2019-10-01', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES):
             from azure.cli.core.commands import LongRunningOperation
             validation_poller = client.begin_validate(resource_group_name, deployment_name, deployment)
             return LongRunningOperation(cmd.cli_ctx)(validation_poller)
@@ -292,26 +413,95 @@ class ApplicationGatewayUpdate(_ApplicationGatewayUpdate):
     def pre_operations(self):
         args = self.ctx.args
         if has_value(args.custom_error_pages):
-            configurations = []
-            for code, url in args.custom_error_pages.items():
-                configurations.append({
-                    "status_code": code,
-                    "custom_error_page_url": url,
-                })
-            args.custom_error_configurations = configurations
+            configurations = [{"status_code": code, "custom_error_page_url": url}
+                              for code, url in args.custom_error_pages.items()]
+            if configurations:
+                args.custom_error_configurations = configurations
         if has_value(args.sku):
             sku = str(args.sku)
-            args.sku.tier = sku.split("_", 1)[0] if not _is_v2_sku(sku) else sku
+            args.sku.tier = sku if _is_v2_sku(sku) else sku.split("_", 1)[0]
+
+
+_STAGED_APP_GATEWAYS = WeakKeyDictionary()
+
+
+class StagedApplicationGateway:
+    """ Batch child changes to an application gateway into a single GET and PUT.
+
+    While the block is active, the `create_ag_*` and `delete_ag_*` helpers and nested stages targeting the same
+    gateway update the staged instance in memory instead of sending their own GET and PUT. The outermost stage PUTs the gateway once
+    when the block exits without error; the resulting poller (or None with `no_wait`) is available as `poller`.
+    """
+
+    def __init__(self, cmd, resource_group_name, application_gateway_name, no_wait=False):
+        self.cli_ctx = cmd.cli_ctx
+        self.resource_group_name = resource_group_name
+        self.application_gateway_name = application_gateway_name
+        self.no_wait = no_wait
+        self.instance = None
+        self.poller = None
+        self._client = _cached_network_client(cmd.cli_ctx).application_gateways
+        self._key = (resource_group_name.lower(), application_gateway_name.lower())
+        self._nested = False
+
+    def __enter__(self):
+        staged = _STAGED_APP_GATEWAYS.setdefault(self.cli_ctx, {})
+        self._nested = self._key in staged
+        if self._nested:
+            self.instance = staged[self._key]
+        else:
+            self.instance = self._client.get(self.resource_group_name, self.application_gateway_name)
+            staged[self._key] = self.instance
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._nested:
+            return
+        _STAGED_APP_GATEWAYS[self.cli_ctx].pop(self._key, None)
+        if exc_type is None:
+            self.poller = sdk_no_wait(self.no_wait, self._client.begin_create_or_update,
+                                      self.resource_group_name, self.application_gateway_name, self.instance)
+
+
+def _get_ag(cmd, resource_group_name, application_gateway_name):
+    """ GET the application gateway once per command, reusing the instance staged by an enclosing
+    `StagedApplicationGateway` instead of sending another request. """
+    staged = _STAGED_APP_GATEWAYS.get(cmd.cli_ctx, {}).get((resource_group_name.lower(),
+                                                             application_gateway_name.lower()))
+    if staged is not None:
+        return staged
+    return _cached_network_client(cmd.cli_ctx).application_gateways.get(resource_group_name,
+                                                                        application_gateway_name)
+
+
+def _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait=False):
+    staged = _STAGED_APP_GATEWAYS.get(cmd.cli_ctx, {}).get((resource_group_name.lower(),
+                                                             application_gateway_name.lower()))
+    if staged is ag:
+        # sent by StagedApplicationGateway on exit
+        return ag
+    return sdk_no_wait(no_wait, _cached_network_client(cmd.cli_ctx).application_gateways.begin_create_or_update,
+                       resource_group_name, application_gateway_name, ag)
+
+
+def _put_ag_and_find(cmd, resource_group_name, application_gateway_name, ag, no_wait, new_item, *args, **kwargs):
+    """ PUT the application gateway and return the server copy of `new_item`, looked up with `find_child_item`.
+    Inside a `StagedApplicationGateway` block nothing has been sent yet, so `new_item` itself is returned. """
+    poller = _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
+    if poller is ag:
+        return new_item
+    if no_wait:
+        return poller
+    return find_child_item(poller.result(), *args, **kwargs)
 
 
 def create_ag_authentication_certificate(cmd, resource_group_name, application_gateway_name, item_name,
                                          cert_data, no_wait=False):
-    AuthCert = cmd.get_models('ApplicationGatewayAuthenticationCertificate')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+    AuthCert = _get_models(cmd, 'ApplicationGatewayAuthenticationCertificate')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_cert = AuthCert(data=cert_data, name=item_name)
-    upsert_to_collection(ag, 'authentication_certificates', new_cert, 'name')
-    return sdk_no_wait(no_wait, ncf.begin_create_or_update, resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'authentication_certificates', new_cert)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_authentication_certificate(instance, parent, item_name, cert_data):
@@ -321,13 +511,11 @@ def update_ag_authentication_certificate(instance, parent, item_name, cert_data)
 
 def create_ag_backend_address_pool(cmd, resource_group_name, application_gateway_name, item_name,
                                    servers=None, no_wait=False):
-    ApplicationGatewayBackendAddressPool = cmd.get_models('ApplicationGatewayBackendAddressPool')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayBackendAddressPool = _get_models(cmd, 'ApplicationGatewayBackendAddressPool')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_pool = ApplicationGatewayBackendAddressPool(name=item_name, backend_addresses=servers)
-    upsert_to_collection(ag, 'backend_address_pools', new_pool, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'backend_address_pools', new_pool)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_backend_address_pool(instance, parent, item_name, servers=None):
@@ -340,10 +528,9 @@ def create_ag_frontend_ip_configuration(cmd, resource_group_name, application_ga
                                         public_ip_address=None, subnet=None,
                                         virtual_network_name=None, private_ip_address=None,
                                         private_ip_address_allocation=None, no_wait=False):
-    ApplicationGatewayFrontendIPConfiguration, SubResource = cmd.get_models(
-        'ApplicationGatewayFrontendIPConfiguration', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayFrontendIPConfiguration, SubResource = _get_models(
+        cmd, 'ApplicationGatewayFrontendIPConfiguration', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     if public_ip_address:
         new_config = ApplicationGatewayFrontendIPConfiguration(
             name=item_name,
@@ -354,15 +541,14 @@ def create_ag_frontend_ip_configuration(cmd, resource_group_name, application_ga
             private_ip_address=private_ip_address if private_ip_address else None,
             private_ip_allocation_method='Static' if private_ip_address else 'Dynamic',
             subnet=SubResource(id=subnet))
-    upsert_to_collection(ag, 'frontend_ip_configurations', new_config, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'frontend_ip_configurations', new_config)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_frontend_ip_configuration(cmd, instance, parent, item_name, public_ip_address=None,
                                         subnet=None, virtual_network_name=None,
                                         private_ip_address=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if public_ip_address is not None:
         instance.public_ip_address = SubResource(id=public_ip_address)
     if subnet is not None:
@@ -375,13 +561,11 @@ def update_ag_frontend_ip_configuration(cmd, instance, parent, item_name, public
 
 def create_ag_frontend_port(cmd, resource_group_name, application_gateway_name, item_name, port,
                             no_wait=False):
-    ApplicationGatewayFrontendPort = cmd.get_models('ApplicationGatewayFrontendPort')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayFrontendPort = _get_models(cmd, 'ApplicationGatewayFrontendPort')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_port = ApplicationGatewayFrontendPort(name=item_name, port=port)
-    upsert_to_collection(ag, 'frontend_ports', new_port, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'frontend_ports', new_port)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_frontend_port(instance, parent, item_name, port=None):
@@ -393,9 +577,8 @@ def update_ag_frontend_port(instance, parent, item_name, port=None):
 def create_ag_http_listener(cmd, resource_group_name, application_gateway_name, item_name,
                             frontend_port, frontend_ip=None, host_name=None, ssl_cert=None,
                             ssl_profile_id=None, firewall_policy=None, no_wait=False, host_names=None):
-    ApplicationGatewayHttpListener, SubResource = cmd.get_models('ApplicationGatewayHttpListener', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayHttpListener, SubResource = _get_models(cmd, 'ApplicationGatewayHttpListener', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     if not frontend_ip:
         frontend_ip = _get_default_id(ag, 'frontend_ip_configurations', '--frontend-ip')
     new_listener = ApplicationGatewayHttpListener(
@@ -409,20 +592,19 @@ def create_ag_http_listener(cmd, resource_group_name, application_gateway_name,
         host_names=host_names
     )
 
-    if cmd.supported_api_version(min_api='2019-09-01'):
+    if _supported_api_version(cmd, min_api='2019-09-01'):
         new_listener.firewall_policy = SubResource(id=firewall_policy) if firewall_policy else None
 
-    if cmd.supported_api_version(min_api='2020-06-01'):
+    if _supported_api_version(cmd, min_api='2020-06-01'):
         new_listener.ssl_profile = SubResource(id=ssl_profile_id) if ssl_profile_id else None
 
-    upsert_to_collection(ag, 'http_listeners', new_listener, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'http_listeners', new_listener)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_http_listener(cmd, instance, parent, item_name, frontend_ip=None, frontend_port=None,
                             host_name=None, ssl_cert=None, ssl_profile_id=None, firewall_policy=None, host_names=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if frontend_ip is not None:
         instance.frontend_ip_configuration = SubResource(id=frontend_ip)
     if frontend_port is not None:
@@ -437,11 +619,11 @@ def update_ag_http_listener(cmd, instance, parent, item_name, frontend_ip=None,
     if host_name is not None:
         instance.host_name = host_name or None
 
-    if cmd.supported_api_version(min_api='2019-09-01'):
+    if _supported_api_version(cmd, min_api='2019-09-01'):
         if firewall_policy is not None:
             instance.firewall_policy = SubResource(id=firewall_policy)
 
-    if cmd.supported_api_version(min_api='2020-06-01'):
+    if _supported_api_version(cmd, min_api='2020-06-01'):
         if ssl_profile_id is not None:
             instance.ssl_profile = SubResource(id=ssl_profile_id)
 
@@ -455,9 +637,8 @@ def update_ag_http_listener(cmd, instance, parent, item_name, frontend_ip=None,
 def create_ag_listener(cmd, resource_group_name, application_gateway_name, item_name,
                        frontend_port, frontend_ip=None, ssl_cert=None,
                        ssl_profile_id=None, no_wait=False):
-    ApplicationGatewayListener, SubResource = cmd.get_models('ApplicationGatewayListener', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayListener, SubResource = _get_models(cmd, 'ApplicationGatewayListener', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     if not frontend_ip:
         frontend_ip = _get_default_id(ag, 'frontend_ip_configurations', '--frontend-ip')
     new_listener = ApplicationGatewayListener(
@@ -470,14 +651,13 @@ def create_ag_listener(cmd, resource_group_name, application_gateway_name, item_
 
     new_listener.ssl_profile = SubResource(id=ssl_profile_id) if ssl_profile_id else None
 
-    upsert_to_collection(ag, 'listeners', new_listener, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'listeners', new_listener)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_listener(cmd, instance, parent, item_name, frontend_ip=None, frontend_port=None,
                        ssl_cert=None, ssl_profile_id=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if frontend_ip is not None:
         instance.frontend_ip_configuration = SubResource(id=frontend_ip)
     if frontend_port is not None:
@@ -498,16 +678,14 @@ def update_ag_listener(cmd, instance, parent, item_name, frontend_ip=None, front
 
 def assign_ag_identity(cmd, resource_group_name, application_gateway_name,
                        user_assigned_identity, no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = _cached_network_client(cmd.cli_ctx).application_gateways
     ag = ncf.get(resource_group_name, application_gateway_name)
     ManagedServiceIdentity, ManagedServiceIdentityUserAssignedIdentitiesValue = \
-        cmd.get_models('ManagedServiceIdentity',
-                       'Components1Jq1T4ISchemasManagedserviceidentityPropertiesUserassignedidentitiesAdditionalproperties')  # pylint: disable=line-too-long
-    user_assigned_indentity_instance = ManagedServiceIdentityUserAssignedIdentitiesValue()
-
-    user_assigned_identities_instance = dict()
-
-    user_assigned_identities_instance[user_assigned_identity] = user_assigned_indentity_instance
+        _get_models(cmd, 'ManagedServiceIdentity',
+                    'Components1Jq1T4ISchemasManagedserviceidentityPropertiesUserassignedidentitiesAdditionalproperties')  # pylint: disable=line-too-long
+    user_assigned_identities_instance = {
+        user_assigned_identity: ManagedServiceIdentityUserAssignedIdentitiesValue()
+    }
 
     identity_instance = ManagedServiceIdentity(
         type="UserAssigned",
@@ -519,7 +697,7 @@ def assign_ag_identity(cmd, resource_group_name, application_gateway_name,
 
 
 def remove_ag_identity(cmd, resource_group_name, application_gateway_name, no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = _cached_network_client(cmd.cli_ctx).application_gateways
     ag = ncf.get(resource_group_name, application_gateway_name)
     if ag.identity is None:
         logger.warning("This command will be ignored. The identity doesn't exist.")
@@ -529,7 +707,7 @@ def remove_ag_identity(cmd, resource_group_name, application_gateway_name, no_wa
 
 
 def show_ag_identity(cmd, resource_group_name, application_gateway_name):
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = _cached_network_client(cmd.cli_ctx).application_gateways
     ag = ncf.get(resource_group_name, application_gateway_name)
     if ag.identity is None:
         raise CLIError("Please first use 'az network application-gateway identity assign` to init the identity.")
@@ -546,13 +724,13 @@ def add_ag_private_link(cmd,
                         private_link_primary=None,
                         private_link_ip_address=None,
                         no_wait=False):
-    (SubResource, IPAllocationMethod, Subnet,
+    (SubResource, Subnet,
      ApplicationGatewayPrivateLinkConfiguration,
-     ApplicationGatewayPrivateLinkIpConfiguration) = cmd.get_models(
-         'SubResource', 'IPAllocationMethod', 'Subnet',
+     ApplicationGatewayPrivateLinkIpConfiguration) = _get_models(
+         cmd, 'SubResource', 'Subnet',
          'ApplicationGatewayPrivateLinkConfiguration', 'ApplicationGatewayPrivateLinkIpConfiguration')
 
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
 
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
     private_link_config_id = resource_id(
@@ -565,34 +743,34 @@ def add_ag_private_link(cmd,
         child_name_1=private_link_name
     )
 
-    if not any(fic for fic in appgw.frontend_ip_configurations if fic.name == frontend_ip):
-        raise CLIError("Frontend IP doesn't exist")
-
+    # index the frontend IP configurations and the private links they reference in one pass
+    fics, fic_private_link_ids = {}, set()
     for fic in appgw.frontend_ip_configurations:
-        if fic.private_link_configuration and fic.private_link_configuration.id == private_link_config_id:
-            raise CLIError('Frontend IP already reference an existing Private Link')
-        if fic.name == frontend_ip:
-            break
-    else:
+        fics[fic.name] = fic
+        if fic.private_link_configuration:
+            fic_private_link_ids.add(fic.private_link_configuration.id)
+
+    if frontend_ip not in fics:
         raise CLIError("Frontend IP doesn't exist")
+    if private_link_config_id in fic_private_link_ids:
+        raise CLIError('Frontend IP already reference an existing Private Link')
 
     if appgw.private_link_configurations is not None:
-        for pl in appgw.private_link_configurations:
-            if pl.name == private_link_name:
-                raise CLIError('Private Link name duplicates')
+        if any(pl.name == private_link_name for pl in appgw.private_link_configurations):
+            raise CLIError('Private Link name duplicates')
 
     # get the virtual network of this application gateway
     vnet_name = parse_resource_id(appgw.gateway_ip_configurations[0].subnet.id)['name']
     vnet = ncf.virtual_networks.get(resource_group_name, vnet_name)
 
     # prepare the subnet for new private link
-    for subnet in vnet.subnets:
-        if subnet.name == private_link_subnet_name_or_id:
-            raise CLIError('Subnet name duplicates. In order to use existing subnet, please enter subnet ID.')
-        if subnet.address_prefix == private_link_subnet_prefix:
-            raise CLIError('Subnet prefix duplicates')
-        if subnet.address_prefixes and private_link_subnet_prefix in subnet.address_prefixes:
-            raise CLIError('Subnet prefix duplicates')
+    subnet_names = {subnet.name for subnet in vnet.subnets}
+    if private_link_subnet_name_or_id in subnet_names:
+        raise CLIError('Subnet name duplicates. In order to use existing subnet, please enter subnet ID.')
+    subnet_prefixes = {prefix for subnet in vnet.subnets
+                       for prefix in [subnet.address_prefix] + (subnet.address_prefixes or [])}
+    if private_link_subnet_prefix in subnet_prefixes:
+        raise CLIError('Subnet prefix duplicates')
 
     if is_valid_resource_id(private_link_subnet_name_or_id):
         private_link_subnet_id = private_link_subnet_name_or_id
@@ -600,24 +778,15 @@ def add_ag_private_link(cmd,
         private_link_subnet = Subnet(name=private_link_subnet_name_or_id,
                                      address_prefix=private_link_subnet_prefix,
                                      private_link_service_network_policies='Disabled')
-        private_link_subnet_id = resource_id(
-            subscription=get_subscription_id(cmd.cli_ctx),
-            resource_group=resource_group_name,
-            namespace='Microsoft.Network',
-            type='virtualNetworks',
-            name=vnet_name,
-            child_type_1='subnets',
-            child_name_1=private_link_subnet_name_or_id
-        )
-        vnet.subnets.append(private_link_subnet)
-        ncf.virtual_networks.begin_create_or_update(resource_group_name, vnet_name, vnet)
+        private_link_subnet_id = f'{vnet.id}/subnets/{private_link_subnet_name_or_id}'
+        # subnets are child resources of their own, so only the new subnet needs to be sent
+        ncf.subnets.begin_create_or_update(resource_group_name, vnet_name, private_link_subnet_name_or_id,
+                                           private_link_subnet)
 
-    private_link_ip_allocation_method = IPAllocationMethod.static.value if private_link_ip_address \
-        else IPAllocationMethod.dynamic.value
     private_link_ip_config = ApplicationGatewayPrivateLinkIpConfiguration(
         name='PrivateLinkDefaultIPConfiguration',
         private_ip_address=private_link_ip_address,
-        private_ip_allocation_method=private_link_ip_allocation_method,
+        private_ip_allocation_method=_get_ip_allocation_method(cmd, private_link_ip_address),
         subnet=SubResource(id=private_link_subnet_id),
         primary=private_link_primary
     )
@@ -627,9 +796,7 @@ def add_ag_private_link(cmd,
     )
 
     # associate the private link with the frontend IP configuration
-    for fic in appgw.frontend_ip_configurations:
-        if fic.name == frontend_ip:
-            fic.private_link_configuration = SubResource(id=private_link_config_id)
+    fics[frontend_ip].private_link_configuration = SubResource(id=private_link_config_id)
 
     if appgw.private_link_configurations is None:
         appgw.private_link_configurations = []
@@ -645,25 +812,17 @@ def show_ag_private_link(cmd,
                          resource_group_name,
                          application_gateway_name,
                          private_link_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
 
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
 
-    target_private_link = None
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            target_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
-
-    return target_private_link
+    return _get_child_by_name(appgw.private_link_configurations, private_link_name, 'Private Link')
 
 
 def list_ag_private_link(cmd,
                          resource_group_name,
                          application_gateway_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
 
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
     return appgw.private_link_configurations
@@ -674,110 +833,83 @@ def remove_ag_private_link(cmd,
                            application_gateway_name,
                            private_link_name,
                            no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        appgw = staged.instance
+        removed_private_link = _get_child_by_name(appgw.private_link_configurations, private_link_name,
+                                                  'Private Link')
 
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+        for fic in appgw.frontend_ip_configurations:
+            if fic.private_link_configuration and fic.private_link_configuration.id == removed_private_link.id:
+                fic.private_link_configuration = None
 
-    removed_private_link = None
+        # the left vnet have to delete manually
+        # rs = parse_resource_id(removed_private_link.ip_configurations[0].subnet.id)
+        # vnet_resource_group, vnet_name, subnet = rs['resource_group'], rs['name'], rs['child_name_1']
+        # ncf.subnets.delete(vnet_resource_group, vnet_name, subnet)
 
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            removed_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
-
-    for fic in appgw.frontend_ip_configurations:
-        if fic.private_link_configuration and fic.private_link_configuration.id == removed_private_link.id:
-            fic.private_link_configuration = None
-
-    # the left vnet have to delete manually
-    # rs = parse_resource_id(removed_private_link.ip_configurations[0].subnet.id)
-    # vnet_resource_group, vnet_name, subnet = rs['resource_group'], rs['name'], rs['child_name_1']
-    # ncf.subnets.delete(vnet_resource_group, vnet_name, subnet)
-
-    appgw.private_link_configurations.remove(removed_private_link)
-    return sdk_no_wait(no_wait,
-                       ncf.application_gateways.begin_create_or_update,
-                       resource_group_name,
-                       application_gateway_name,
-                       appgw)
+        appgw.private_link_configurations.remove(removed_private_link)
+    return staged.poller
 
 
 # region application-gateway trusted-client-certificates
 def add_trusted_client_certificate(cmd, resource_group_name, application_gateway_name, client_cert_name,
                                    client_cert_data, no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
-    ApplicationGatewayTrustedClientCertificate = cmd.get_models('ApplicationGatewayTrustedClientCertificate')
-    cert = ApplicationGatewayTrustedClientCertificate(name=client_cert_name, data=client_cert_data)
-    appgw.trusted_client_certificates.append(cert)
-
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update, resource_group_name,
-                       application_gateway_name, appgw)
+    ApplicationGatewayTrustedClientCertificate = _get_models(cmd, 'ApplicationGatewayTrustedClientCertificate')
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        cert = ApplicationGatewayTrustedClientCertificate(name=client_cert_name, data=client_cert_data)
+        staged.instance.trusted_client_certificates.append(cert)
+    return staged.poller
 
 
 def update_trusted_client_certificate(cmd, resource_group_name, application_gateway_name, client_cert_name,
                                       client_cert_data, no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
-
-    for cert in appgw.trusted_client_certificates:
-        if cert.name == client_cert_name:
-            cert.data = client_cert_data
-            break
-    else:
-        raise ResourceNotFoundError(f"Trusted client certificate {client_cert_name} doesn't exist")
-
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update, resource_group_name,
-                       application_gateway_name, appgw)
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        cert = _get_child_by_name(staged.instance.trusted_client_certificates, client_cert_name,
+                                  'Trusted client certificate')
+        cert.data = client_cert_data
+    return staged.poller
 
 
 def list_trusted_client_certificate(cmd, resource_group_name, application_gateway_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
     return appgw.trusted_client_certificates
 
 
 def remove_trusted_client_certificate(cmd, resource_group_name, application_gateway_name, client_cert_name,
                                       no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
-
-    for cert in appgw.trusted_client_certificates:
-        if cert.name == client_cert_name:
-            appgw.trusted_client_certificates.remove(cert)
-            break
-    else:
-        raise ResourceNotFoundError(f"Trusted client certificate {client_cert_name} doesn't exist")
-
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update, resource_group_name,
-                       application_gateway_name, appgw)
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        appgw = staged.instance
+        certs = [cert for cert in appgw.trusted_client_certificates if cert.name != client_cert_name]
+        if len(certs) == len(appgw.trusted_client_certificates):
+            raise ResourceNotFoundError(f"Trusted client certificate {client_cert_name} doesn't exist")
+        appgw.trusted_client_certificates = certs
+    return staged.poller
 
 
 def show_trusted_client_certificate(cmd, resource_group_name, application_gateway_name, client_cert_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
 
-    instance = None
-    for cert in appgw.trusted_client_certificates:
-        if cert.name == client_cert_name:
-            instance = cert
-            break
-    else:
-        raise ResourceNotFoundError(f"Trusted client certificate {client_cert_name} doesn't exist")
+    return _get_child_by_name(appgw.trusted_client_certificates, client_cert_name, 'Trusted client certificate')
 
-    return instance
+
+@lru_cache(maxsize=None)
+def _backend_health_operations():
+    from azure.cli.core.commands import LongRunningOperation
+    from .aaz.latest.network.application_gateway._health import Health
+    from .aaz.latest.network.application_gateway._health_on_demand import HealthOnDemand
+    return LongRunningOperation, Health, HealthOnDemand
 
 
 def show_ag_backend_health(cmd, resource_group_name, application_gateway_name, expand=None,
                            protocol=None, host=None, path=None, timeout=None, host_name_from_http_settings=None,
                            match_body=None, match_status_codes=None, address_pool=None, http_settings=None):
-    from azure.cli.core.commands import LongRunningOperation
-    on_demand_arguments = {protocol, host, path, timeout, host_name_from_http_settings, match_body, match_status_codes,
-                           address_pool, http_settings}
-    if on_demand_arguments.difference({None}):
-        from .aaz.latest.network.application_gateway._health_on_demand import HealthOnDemand
+    LongRunningOperation, Health, HealthOnDemand = _backend_health_operations()
+    on_demand_arguments = (protocol, host, path, timeout, host_name_from_http_settings, match_body, match_status_codes,
+                           address_pool, http_settings)
+    # match_status_codes is a list, so the arguments cannot be collected into a set
+    if any(arg is not None for arg in on_demand_arguments):
         return LongRunningOperation(cmd.cli_ctx)(
             HealthOnDemand(cli_ctx=cmd.cli_ctx)(command_args={
                 "name": application_gateway_name,
@@ -795,7 +927,6 @@ def show_ag_backend_health(cmd, resource_group_name, application_gateway_name, e
             })
         )
 
-    from .aaz.latest.network.application_gateway._health import Health
     return LongRunningOperation(cmd.cli_ctx)(
         Health(cli_ctx=cmd.cli_ctx)(command_args={
             "name": application_gateway_name,
@@ -807,25 +938,28 @@ def show_ag_backend_health(cmd, resource_group_name, application_gateway_name, e
 
 
 # region application-gateway ssl-profile
+def _register_ssl_profile_args(args_schema, nullable):
+    args_schema.client_auth_config = AAZBoolArg(
+        options=["--client-auth-configuration", "--client-auth-config"],
+        help="Client authentication configuration of the application gateway resource.",
+        nullable=nullable,
+    )
+    args_schema.trusted_client_certs = AAZListArg(
+        options=["--trusted-client-certificates", "--trusted-client-cert"],
+        help="Array of references to application gateway trusted client certificates.",
+        nullable=nullable,
+    )
+    args_schema.trusted_client_certs.Element = AAZResourceIdArg(
+        fmt=_ag_child_fmt("trustedClientCertificates"),
+        nullable=nullable,
+    )
+
+
 class SSLProfileAdd(_SSLProfileAdd):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZBoolArg, AAZListArg, AAZResourceIdArg, AAZResourceIdArgFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
-        args_schema.client_auth_config = AAZBoolArg(
-            options=["--client-auth-configuration", "--client-auth-config"],
-            help="Client authentication configuration of the application gateway resource.",
-        )
-        args_schema.trusted_client_certs = AAZListArg(
-            options=["--trusted-client-certificates", "--trusted-client-cert"],
-            help="Array of references to application gateway trusted client certificates.",
-        )
-        args_schema.trusted_client_certs.Element = AAZResourceIdArg(
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/trustedClientCertificates/{}",
-            ),
-        )
+        _register_ssl_profile_args(args_schema, nullable=False)
         args_schema.auth_configuration._registered = False
         args_schema.client_certificates._registered = False
         return args_schema
@@ -848,25 +982,8 @@ class SSLProfileAdd(_SSLProfileAdd):
 class SSLProfileUpdate(_SSLProfileUpdate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZBoolArg, AAZListArg, AAZResourceIdArg, AAZResourceIdArgFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
-        args_schema.client_auth_config = AAZBoolArg(
-            options=["--client-auth-configuration", "--client-auth-config"],
-            help="Client authentication configuration of the application gateway resource.",
-            nullable=True,
-        )
-        args_schema.trusted_client_certs = AAZListArg(
-            options=["--trusted-client-certificates", "--trusted-client-cert"],
-            help="Array of references to application gateway trusted client certificates.",
-            nullable=True,
-        )
-        args_schema.trusted_client_certs.Element = AAZResourceIdArg(
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/trustedClientCertificates/{}",
-            ),
-            nullable=True,
-        )
+        _register_ssl_profile_args(args_schema, nullable=True)
         args_schema.auth_configuration._registered = False
         args_schema.client_certificates._registered = False
         return args_schema
@@ -906,42 +1023,25 @@ def add_ag_private_link_ip(cmd,
                            private_link_primary=False,
                            private_link_ip_address=None,
                            no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
+    SubResource, ApplicationGatewayPrivateLinkIpConfiguration = \
+        _get_models(cmd, 'SubResource', 'ApplicationGatewayPrivateLinkIpConfiguration')
 
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        target_private_link = _get_child_by_name(staged.instance.private_link_configurations, private_link_name,
+                                                 'Private Link')
 
-    target_private_link = None
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            target_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
-
-    (SubResource, IPAllocationMethod,
-     ApplicationGatewayPrivateLinkIpConfiguration) = \
-        cmd.get_models('SubResource', 'IPAllocationMethod',
-                       'ApplicationGatewayPrivateLinkIpConfiguration')
-
-    private_link_subnet_id = target_private_link.ip_configurations[0].subnet.id
+        private_link_subnet_id = target_private_link.ip_configurations[0].subnet.id
 
-    private_link_ip_allocation_method = IPAllocationMethod.static.value if private_link_ip_address \
-        else IPAllocationMethod.dynamic.value
-    private_link_ip_config = ApplicationGatewayPrivateLinkIpConfiguration(
-        name=private_link_ip_name,
-        private_ip_address=private_link_ip_address,
-        private_ip_allocation_method=private_link_ip_allocation_method,
-        subnet=SubResource(id=private_link_subnet_id),
-        primary=private_link_primary
-    )
-
-    target_private_link.ip_configurations.append(private_link_ip_config)
+        private_link_ip_config = ApplicationGatewayPrivateLinkIpConfiguration(
+            name=private_link_ip_name,
+            private_ip_address=private_link_ip_address,
+            private_ip_allocation_method=_get_ip_allocation_method(cmd, private_link_ip_address),
+            subnet=SubResource(id=private_link_subnet_id),
+            primary=private_link_primary
+        )
 
-    return sdk_no_wait(no_wait,
-                       ncf.application_gateways.begin_create_or_update,
-                       resource_group_name,
-                       application_gateway_name,
-                       appgw)
+        target_private_link.ip_configurations.append(private_link_ip_config)
+    return staged.poller
 
 
 def show_ag_private_link_ip(cmd,
@@ -949,44 +1049,24 @@ def show_ag_private_link_ip(cmd,
                             application_gateway_name,
                             private_link_name,
                             private_link_ip_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
 
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
 
-    target_private_link = None
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            target_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
+    target_private_link = _get_child_by_name(appgw.private_link_configurations, private_link_name, 'Private Link')
 
-    target_private_link_ip_config = None
-    for pic in target_private_link.ip_configurations:
-        if pic.name == private_link_ip_name:
-            target_private_link_ip_config = pic
-            break
-    else:
-        raise CLIError("IP Configuration doesn't exist")
-
-    return target_private_link_ip_config
+    return _get_child_by_name(target_private_link.ip_configurations, private_link_ip_name, 'IP Configuration')
 
 
 def list_ag_private_link_ip(cmd,
                             resource_group_name,
                             application_gateway_name,
                             private_link_name):
-    ncf = network_client_factory(cmd.cli_ctx)
+    ncf = _cached_network_client(cmd.cli_ctx)
 
     appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
 
-    target_private_link = None
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            target_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
+    target_private_link = _get_child_by_name(appgw.private_link_configurations, private_link_name, 'Private Link')
 
     return target_private_link.ip_configurations
 
@@ -997,31 +1077,16 @@ def remove_ag_private_link_ip(cmd,
                               private_link_name,
                               private_link_ip_name,
                               no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
-
-    appgw = ncf.application_gateways.get(resource_group_name, application_gateway_name)
-
-    target_private_link = None
-    for pl in appgw.private_link_configurations:
-        if pl.name == private_link_name:
-            target_private_link = pl
-            break
-    else:
-        raise CLIError("Priavte Link doesn't exist")
-
-    updated_ip_configurations = target_private_link.ip_configurations
-    for pic in target_private_link.ip_configurations:
-        if pic.name == private_link_ip_name:
-            updated_ip_configurations.remove(pic)
-            break
-    else:
-        raise CLIError("IP Configuration doesn't exist")
+    with StagedApplicationGateway(cmd, resource_group_name, application_gateway_name, no_wait) as staged:
+        target_private_link = _get_child_by_name(staged.instance.private_link_configurations, private_link_name,
+                                                 'Private Link')
 
-    return sdk_no_wait(no_wait,
-                       ncf.application_gateways.begin_create_or_update,
-                       resource_group_name,
-                       application_gateway_name,
-                       appgw)
+        pics = target_private_link.ip_configurations
+        new_pics = [pic for pic in pics if pic.name != private_link_ip_name]
+        if len(new_pics) == len(pics):
+            raise CLIError("IP Configuration doesn't exist")
+        target_private_link.ip_configurations = new_pics
+    return staged.poller
 
 
 def create_ag_backend_http_settings_collection(cmd, resource_group_name, application_gateway_name, item_name, port,
@@ -1030,10 +1095,9 @@ def create_ag_backend_http_settings_collection(cmd, resource_group_name, applica
                                                host_name=None, host_name_from_backend_pool=None,
                                                affinity_cookie_name=None, enable_probe=None, path=None,
                                                auth_certs=None, root_certs=None):
-    ApplicationGatewayBackendHttpSettings, ApplicationGatewayConnectionDraining, SubResource = cmd.get_models(
-        'ApplicationGatewayBackendHttpSettings', 'ApplicationGatewayConnectionDraining', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayBackendHttpSettings, ApplicationGatewayConnectionDraining, SubResource = _get_models(
+        cmd, 'ApplicationGatewayBackendHttpSettings', 'ApplicationGatewayConnectionDraining', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_settings = ApplicationGatewayBackendHttpSettings(
         port=port,
         protocol=protocol,
@@ -1041,23 +1105,22 @@ def create_ag_backend_http_settings_collection(cmd, resource_group_name, applica
         request_timeout=timeout,
         probe=SubResource(id=probe) if probe else None,
         name=item_name)
-    if cmd.supported_api_version(min_api='2016-09-01'):
+    if _supported_api_version(cmd, min_api='2016-09-01'):
         new_settings.authentication_certificates = [SubResource(id=x) for x in auth_certs or []]
-    if cmd.supported_api_version(min_api='2016-12-01'):
+    if _supported_api_version(cmd, min_api='2016-12-01'):
         new_settings.connection_draining = \
             ApplicationGatewayConnectionDraining(
                 enabled=bool(connection_draining_timeout), drain_timeout_in_sec=connection_draining_timeout or 1)
-    if cmd.supported_api_version(min_api='2017-06-01'):
+    if _supported_api_version(cmd, min_api='2017-06-01'):
         new_settings.host_name = host_name
         new_settings.pick_host_name_from_backend_address = host_name_from_backend_pool
         new_settings.affinity_cookie_name = affinity_cookie_name
         new_settings.probe_enabled = enable_probe
         new_settings.path = path
-    if cmd.supported_api_version(min_api='2019-04-01'):
+    if _supported_api_version(cmd, min_api='2019-04-01'):
         new_settings.trusted_root_certificates = [SubResource(id=x) for x in root_certs or []]
-    upsert_to_collection(ag, 'backend_http_settings_collection', new_settings, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'backend_http_settings_collection', new_settings)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_backend_http_settings_collection(cmd, instance, parent, item_name, port=None, probe=None, protocol=None,
@@ -1066,7 +1129,7 @@ def update_ag_backend_http_settings_collection(cmd, instance, parent, item_name,
                                                host_name=None, host_name_from_backend_pool=None,
                                                affinity_cookie_name=None, enable_probe=None, path=None,
                                                auth_certs=None, root_certs=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if auth_certs == "":
         instance.authentication_certificates = None
     elif auth_certs is not None:
@@ -1075,31 +1138,23 @@ def update_ag_backend_http_settings_collection(cmd, instance, parent, item_name,
         instance.trusted_root_certificates = None
     elif root_certs is not None:
         instance.trusted_root_certificates = [SubResource(id=x) for x in root_certs]
-    if port is not None:
-        instance.port = port
     if probe is not None:
         instance.probe = SubResource(id=probe)
-    if protocol is not None:
-        instance.protocol = protocol
-    if cookie_based_affinity is not None:
-        instance.cookie_based_affinity = cookie_based_affinity
-    if timeout is not None:
-        instance.request_timeout = timeout
     if connection_draining_timeout is not None:
         instance.connection_draining = {
             'enabled': bool(connection_draining_timeout),
             'drain_timeout_in_sec': connection_draining_timeout or 1
         }
-    if host_name is not None:
-        instance.host_name = host_name
-    if host_name_from_backend_pool is not None:
-        instance.pick_host_name_from_backend_address = host_name_from_backend_pool
-    if affinity_cookie_name is not None:
-        instance.affinity_cookie_name = affinity_cookie_name
-    if enable_probe is not None:
-        instance.probe_enabled = enable_probe
-    if path is not None:
-        instance.path = path
+    _set_if_not_none(instance,
+                     port=port,
+                     protocol=protocol,
+                     cookie_based_affinity=cookie_based_affinity,
+                     request_timeout=timeout,
+                     host_name=host_name,
+                     pick_host_name_from_backend_address=host_name_from_backend_pool,
+                     affinity_cookie_name=affinity_cookie_name,
+                     probe_enabled=enable_probe,
+                     path=path)
     return parent
 
 
@@ -1108,10 +1163,9 @@ def create_ag_backend_settings_collection(cmd, resource_group_name, application_
                                           no_wait=False,
                                           host_name=None, host_name_from_backend_pool=None,
                                           path=None, root_certs=None):
-    ApplicationGatewayBackendSettings, SubResource = cmd.get_models(
-        'ApplicationGatewayBackendSettings', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayBackendSettings, SubResource = _get_models(
+        cmd, 'ApplicationGatewayBackendSettings', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_settings = ApplicationGatewayBackendSettings(
         port=port,
         protocol=protocol,
@@ -1122,44 +1176,37 @@ def create_ag_backend_settings_collection(cmd, resource_group_name, application_
     new_settings.pick_host_name_from_backend_address = host_name_from_backend_pool
     new_settings.path = path
     new_settings.trusted_root_certificates = [SubResource(id=x) for x in root_certs or []]
-    upsert_to_collection(ag, 'backend_settings_collection', new_settings, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'backend_settings_collection', new_settings)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_backend_settings_collection(cmd, instance, parent, item_name, port=None, probe=None, protocol=None,
                                           timeout=None,
                                           host_name=None, host_name_from_backend_pool=None,
                                           path=None, root_certs=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if root_certs == "":
         instance.trusted_root_certificates = None
     elif root_certs is not None:
         instance.trusted_root_certificates = [SubResource(id=x) for x in root_certs]
-    if port is not None:
-        instance.port = port
     if probe is not None:
         instance.probe = SubResource(id=probe)
-    if protocol is not None:
-        instance.protocol = protocol
-    if timeout is not None:
-        instance.timeout = timeout
-    if host_name is not None:
-        instance.host_name = host_name
-    if host_name_from_backend_pool is not None:
-        instance.pick_host_name_from_backend_address = host_name_from_backend_pool
-    if path is not None:
-        instance.path = path
+    _set_if_not_none(instance,
+                     port=port,
+                     protocol=protocol,
+                     timeout=timeout,
+                     host_name=host_name,
+                     pick_host_name_from_backend_address=host_name_from_backend_pool,
+                     path=path)
     return parent
 
 
 def create_ag_redirect_configuration(cmd, resource_group_name, application_gateway_name, item_name, redirect_type,
                                      target_listener=None, target_url=None, include_path=None,
                                      include_query_string=None, no_wait=False):
-    ApplicationGatewayRedirectConfiguration, SubResource = cmd.get_models(
-        'ApplicationGatewayRedirectConfiguration', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayRedirectConfiguration, SubResource = _get_models(
+        cmd, 'ApplicationGatewayRedirectConfiguration', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_config = ApplicationGatewayRedirectConfiguration(
         name=item_name,
         redirect_type=redirect_type,
@@ -1167,14 +1214,14 @@ def create_ag_redirect_configuration(cmd, resource_group_name, application_gatew
         target_url=target_url,
         include_path=include_path,
         include_query_string=include_query_string)
-    upsert_to_collection(ag, 'redirect_configurations', new_config, 'name')
-    return sdk_no_wait(no_wait, ncf.begin_create_or_update, resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'redirect_configurations', new_config)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_redirect_configuration(cmd, instance, parent, item_name, redirect_type=None,
                                      target_listener=None, target_url=None, include_path=None,
                                      include_query_string=None, raw=False):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if redirect_type:
         instance.redirect_type = redirect_type
     if target_listener:
@@ -1183,26 +1230,18 @@ def update_ag_redirect_configuration(cmd, instance, parent, item_name, redirect_
     if target_url:
         instance.target_listener = None
         instance.target_url = target_url
-    if include_path is not None:
-        instance.include_path = include_path
-    if include_query_string is not None:
-        instance.include_query_string = include_query_string
+    _set_if_not_none(instance, include_path=include_path, include_query_string=include_query_string)
     return parent
 
 
 def create_ag_rewrite_rule_set(cmd, resource_group_name, application_gateway_name, item_name, no_wait=False):
-    ApplicationGatewayRewriteRuleSet = cmd.get_models(
-        'ApplicationGatewayRewriteRuleSet')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayRewriteRuleSet = _get_models(
+        cmd, 'ApplicationGatewayRewriteRuleSet')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_set = ApplicationGatewayRewriteRuleSet(name=item_name)
-    upsert_to_collection(ag, 'rewrite_rule_sets', new_set, 'name')
-    if no_wait:
-        return sdk_no_wait(no_wait, ncf.begin_create_or_update, resource_group_name, application_gateway_name, ag)
-    parent = sdk_no_wait(no_wait, ncf.begin_create_or_update,
-                         resource_group_name, application_gateway_name, ag).result()
-    return find_child_item(parent, item_name,
-                           path='rewrite_rule_sets', key_path='name')
+    _upsert_in_place(ag, 'rewrite_rule_sets', new_set)
+    return _put_ag_and_find(cmd, resource_group_name, application_gateway_name, ag, no_wait, new_set, item_name,
+                            path='rewrite_rule_sets', key_path='name')
 
 
 def update_ag_rewrite_rule_set(instance, parent, item_name):
@@ -1214,15 +1253,14 @@ def create_ag_rewrite_rule(cmd, resource_group_name, application_gateway_name, r
                            modified_path=None, modified_query_string=None, enable_reroute=None):
     (ApplicationGatewayRewriteRule,
      ApplicationGatewayRewriteRuleActionSet,
-     ApplicationGatewayUrlConfiguration) = cmd.get_models('ApplicationGatewayRewriteRule',
-                                                          'ApplicationGatewayRewriteRuleActionSet',
-                                                          'ApplicationGatewayUrlConfiguration')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+     ApplicationGatewayUrlConfiguration) = _get_models(cmd, 'ApplicationGatewayRewriteRule',
+                                                       'ApplicationGatewayRewriteRuleActionSet',
+                                                       'ApplicationGatewayUrlConfiguration')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     rule_set = find_child_item(ag, rule_set_name,
                                path='rewrite_rule_sets', key_path='name')
     url_configuration = None
-    if any([modified_path, modified_query_string, enable_reroute]):
+    if modified_path is not None or modified_query_string is not None or enable_reroute is not None:
         url_configuration = ApplicationGatewayUrlConfiguration(modified_path=modified_path,
                                                                modified_query_string=modified_query_string,
                                                                reroute=enable_reroute)
@@ -1236,59 +1274,68 @@ def create_ag_rewrite_rule(cmd, resource_group_name, application_gateway_name, r
         )
     )
     upsert_to_collection(rule_set, 'rewrite_rules', new_rule, 'name')
-    if no_wait:
-        return sdk_no_wait(no_wait, ncf.begin_create_or_update, resource_group_name, application_gateway_name, ag)
-    parent = sdk_no_wait(no_wait, ncf.begin_create_or_update,
-                         resource_group_name, application_gateway_name, ag).result()
-    return find_child_item(parent, rule_set_name, rule_name,
-                           path='rewrite_rule_sets.rewrite_rules', key_path='name.name')
+    return _put_ag_and_find(cmd, resource_group_name, application_gateway_name, ag, no_wait, new_rule,
+                            rule_set_name, rule_name, path='rewrite_rule_sets.rewrite_rules', key_path='name.name')
 
 
 def update_ag_rewrite_rule(instance, parent, cmd, rule_set_name, rule_name, sequence=None,
                            request_headers=None, response_headers=None,
                            modified_path=None, modified_query_string=None, enable_reroute=None):
+    # only walk the dotted paths for the values that were given; None never changes anything
+    params = {
+        'rule_sequence': sequence,
+        'action_set.request_header_configurations': request_headers,
+        'action_set.response_header_configurations': response_headers,
+    }
     with cmd.update_context(instance) as c:
-        c.set_param('rule_sequence', sequence)
-        c.set_param('action_set.request_header_configurations', request_headers)
-        c.set_param('action_set.response_header_configurations', response_headers)
-        ApplicationGatewayUrlConfiguration = cmd.get_models('ApplicationGatewayUrlConfiguration')
-        url_configuration = None
-        if any([modified_path, modified_query_string, enable_reroute]):
-            url_configuration = ApplicationGatewayUrlConfiguration(modified_path=modified_path,
-                                                                   modified_query_string=modified_query_string,
-                                                                   reroute=enable_reroute)
-        c.set_param('action_set.url_configuration', url_configuration)
+        for prop, value in params.items():
+            if value is not None:
+                c.set_param(prop, value)
+    url_params = {
+        'modified_path': modified_path,
+        'modified_query_string': modified_query_string,
+        'reroute': enable_reroute,
+    }
+    if any(value is not None for value in url_params.values()):
+        # merge into the existing url configuration so fields that were not given are preserved
+        if instance.action_set is None:
+            ApplicationGatewayRewriteRuleActionSet = _get_models(cmd, 'ApplicationGatewayRewriteRuleActionSet')
+            instance.action_set = ApplicationGatewayRewriteRuleActionSet()
+        url_configuration = instance.action_set.url_configuration
+        if url_configuration is None:
+            ApplicationGatewayUrlConfiguration = _get_models(cmd, 'ApplicationGatewayUrlConfiguration')
+            url_configuration = ApplicationGatewayUrlConfiguration()
+            instance.action_set.url_configuration = url_configuration
+        with cmd.update_context(url_configuration) as c:
+            for prop, value in url_params.items():
+                if value is not None:
+                    c.set_param(prop, value)
     return parent
 
 
 def show_ag_rewrite_rule(cmd, resource_group_name, application_gateway_name, rule_set_name, rule_name):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     return find_child_item(gateway, rule_set_name, rule_name,
                            path='rewrite_rule_sets.rewrite_rules', key_path='name.name')
 
 
 def list_ag_rewrite_rules(cmd, resource_group_name, application_gateway_name, rule_set_name):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     return find_child_collection(gateway, rule_set_name, path='rewrite_rule_sets.rewrite_rules', key_path='name')
 
 
 def delete_ag_rewrite_rule(cmd, resource_group_name, application_gateway_name, rule_set_name, rule_name, no_wait=None):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     rule_set = find_child_item(gateway, rule_set_name, path='rewrite_rule_sets', key_path='name')
     rule = find_child_item(rule_set, rule_name, path='rewrite_rules', key_path='name')
     rule_set.rewrite_rules.remove(rule)
-    sdk_no_wait(no_wait, client.begin_create_or_update, resource_group_name, application_gateway_name, gateway)
+    _put_ag(cmd, resource_group_name, application_gateway_name, gateway, no_wait)
 
 
 def create_ag_rewrite_rule_condition(cmd, resource_group_name, application_gateway_name, rule_set_name, rule_name,
                                      variable, no_wait=False, pattern=None, ignore_case=None, negate=None):
-    ApplicationGatewayRewriteRuleCondition = cmd.get_models(
-        'ApplicationGatewayRewriteRuleCondition')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayRewriteRuleCondition = _get_models(cmd, 'ApplicationGatewayRewriteRuleCondition')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     rule = find_child_item(ag, rule_set_name, rule_name,
                            path='rewrite_rule_sets.rewrite_rules', key_path='name.name')
     new_condition = ApplicationGatewayRewriteRuleCondition(
@@ -1298,12 +1345,9 @@ def create_ag_rewrite_rule_condition(cmd, resource_group_name, application_gatew
         negate=negate
     )
     upsert_to_collection(rule, 'conditions', new_condition, 'variable')
-    if no_wait:
-        return sdk_no_wait(no_wait, ncf.begin_create_or_update, resource_group_name, application_gateway_name, ag)
-    parent = sdk_no_wait(no_wait, ncf.begin_create_or_update,
-                         resource_group_name, application_gateway_name, ag).result()
-    return find_child_item(parent, rule_set_name, rule_name, variable,
-                           path='rewrite_rule_sets.rewrite_rules.conditions', key_path='name.name.variable')
+    return _put_ag_and_find(cmd, resource_group_name, application_gateway_name, ag, no_wait, new_condition,
+                            rule_set_name, rule_name, variable,
+                            path='rewrite_rule_sets.rewrite_rules.conditions', key_path='name.name.variable')
 
 
 def update_ag_rewrite_rule_condition(instance, parent, cmd, rule_set_name, rule_name, variable, pattern=None,
@@ -1317,37 +1361,37 @@ def update_ag_rewrite_rule_condition(instance, parent, cmd, rule_set_name, rule_
 
 def show_ag_rewrite_rule_condition(cmd, resource_group_name, application_gateway_name, rule_set_name,
                                    rule_name, variable):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     return find_child_item(gateway, rule_set_name, rule_name, variable,
                            path='rewrite_rule_sets.rewrite_rules.conditions', key_path='name.name.variable')
 
 
 def list_ag_rewrite_rule_conditions(cmd, resource_group_name, application_gateway_name, rule_set_name, rule_name):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     return find_child_collection(gateway, rule_set_name, rule_name,
                                  path='rewrite_rule_sets.rewrite_rules.conditions', key_path='name.name')
 
 
 def delete_ag_rewrite_rule_condition(cmd, resource_group_name, application_gateway_name, rule_set_name,
                                      rule_name, variable, no_wait=None):
-    client = network_client_factory(cmd.cli_ctx).application_gateways
-    gateway = client.get(resource_group_name, application_gateway_name)
+    gateway = _get_ag(cmd, resource_group_name, application_gateway_name)
     rule = find_child_item(gateway, rule_set_name, rule_name,
                            path='rewrite_rule_sets.rewrite_rules', key_path='name.name')
-    condition = find_child_item(rule, variable, path='conditions', key_path='variable')
-    rule.conditions.remove(condition)
-    sdk_no_wait(no_wait, client.begin_create_or_update, resource_group_name, application_gateway_name, gateway)
+    # find the position in the same pass, so removing it needs no second scan
+    variable_lc = variable.lower()
+    index = next((i for i, x in enumerate(rule.conditions or []) if x.variable.lower() == variable_lc), None)
+    if index is None:
+        raise CLIError("item '{}' not found in conditions".format(variable))
+    del rule.conditions[index]
+    _put_ag(cmd, resource_group_name, application_gateway_name, gateway, no_wait)
 
 
 def create_ag_probe(cmd, resource_group_name, application_gateway_name, item_name, protocol, host, path, interval=30,
                     timeout=120, threshold=8, no_wait=False, host_name_from_http_settings=None, min_servers=None,
                     match_body=None, match_status_codes=None, host_name_from_settings=None, port=None):
-    ApplicationGatewayProbe, ProbeMatchCriteria = cmd.get_models(
-        'ApplicationGatewayProbe', 'ApplicationGatewayProbeHealthResponseMatch')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayProbe, ProbeMatchCriteria = _get_models(
+        cmd, 'ApplicationGatewayProbe', 'ApplicationGatewayProbeHealthResponseMatch')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     new_probe = ApplicationGatewayProbe(
         name=item_name,
         protocol=protocol,
@@ -1356,61 +1400,49 @@ def create_ag_probe(cmd, resource_group_name, application_gateway_name, item_nam
         interval=interval,
         timeout=timeout,
         unhealthy_threshold=threshold)
-    if cmd.supported_api_version(min_api='2017-06-01'):
+    if _supported_api_version(cmd, min_api='2017-06-01'):
         new_probe.pick_host_name_from_backend_http_settings = host_name_from_http_settings
         new_probe.min_servers = min_servers
         new_probe.match = ProbeMatchCriteria(body=match_body, status_codes=match_status_codes)
-    if cmd.supported_api_version(min_api='2019-04-01'):
+    if _supported_api_version(cmd, min_api='2019-04-01'):
         new_probe.port = port
-    if cmd.supported_api_version(min_api='2021-08-01'):
+    if _supported_api_version(cmd, min_api='2021-08-01'):
         new_probe.pick_host_name_from_backend_settings = host_name_from_settings
 
-    upsert_to_collection(ag, 'probes', new_probe, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'probes', new_probe)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_probe(cmd, instance, parent, item_name, protocol=None, host=None, path=None,
                     interval=None, timeout=None, threshold=None, host_name_from_http_settings=None, min_servers=None,
                     match_body=None, match_status_codes=None, host_name_from_settings=None, port=None):
-    if protocol is not None:
-        instance.protocol = protocol
-    if host is not None:
-        instance.host = host
-    if path is not None:
-        instance.path = path
-    if interval is not None:
-        instance.interval = interval
-    if timeout is not None:
-        instance.timeout = timeout
-    if threshold is not None:
-        instance.unhealthy_threshold = threshold
-    if host_name_from_http_settings is not None:
-        instance.pick_host_name_from_backend_http_settings = host_name_from_http_settings
-    if host_name_from_settings is not None:
-        instance.pick_host_name_from_backend_settings = host_name_from_settings
-    if min_servers is not None:
-        instance.min_servers = min_servers
+    _set_if_not_none(instance,
+                     protocol=protocol,
+                     host=host,
+                     path=path,
+                     interval=interval,
+                     timeout=timeout,
+                     unhealthy_threshold=threshold,
+                     pick_host_name_from_backend_http_settings=host_name_from_http_settings,
+                     pick_host_name_from_backend_settings=host_name_from_settings,
+                     min_servers=min_servers,
+                     port=port)
     if match_body is not None or match_status_codes is not None:
-        ProbeMatchCriteria = \
-            cmd.get_models('ApplicationGatewayProbeHealthResponseMatch')
+        ProbeMatchCriteria = _get_models(cmd, 'ApplicationGatewayProbeHealthResponseMatch')
         instance.match = instance.match or ProbeMatchCriteria()
         if match_body is not None:
             instance.match.body = match_body
         if match_status_codes is not None:
             instance.match.status_codes = match_status_codes
-    if port is not None:
-        instance.port = port
     return parent
 
 
 def create_ag_request_routing_rule(cmd, resource_group_name, application_gateway_name, item_name, address_pool=None,
                                    http_settings=None, http_listener=None, redirect_config=None, url_path_map=None,
                                    rule_type='Basic', no_wait=False, rewrite_rule_set=None, priority=None):
-    ApplicationGatewayRequestRoutingRule, SubResource = cmd.get_models(
-        'ApplicationGatewayRequestRoutingRule', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayRequestRoutingRule, SubResource = _get_models(
+        cmd, 'ApplicationGatewayRequestRoutingRule', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     if not address_pool and not redirect_config:
         address_pool = _get_default_id(ag, 'backend_address_pools', '--address-pool')
     if not http_settings and not redirect_config:
@@ -1421,25 +1453,23 @@ def create_ag_request_routing_rule(cmd, resource_group_name, application_gateway
         name=item_name,
         rule_type=rule_type,
         priority=priority,
-        backend_address_pool=SubResource(id=address_pool) if address_pool else None,
-        backend_http_settings=SubResource(id=http_settings) if http_settings else None,
+        backend_address_pool=_sub_resource_or_none(cmd, address_pool),
+        backend_http_settings=_sub_resource_or_none(cmd, http_settings),
         http_listener=SubResource(id=http_listener),
-        url_path_map=SubResource(id=url_path_map) if url_path_map else None)
-    if cmd.supported_api_version(min_api='2017-06-01'):
-        new_rule.redirect_configuration = SubResource(id=redirect_config) if redirect_config else None
-
-    rewrite_rule_set_name = next(key for key, value in locals().items() if id(value) == id(rewrite_rule_set))
-    if cmd.supported_api_version(parameter_name=rewrite_rule_set_name):
-        new_rule.rewrite_rule_set = SubResource(id=rewrite_rule_set) if rewrite_rule_set else None
-    upsert_to_collection(ag, 'request_routing_rules', new_rule, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+        url_path_map=_sub_resource_or_none(cmd, url_path_map))
+    if _supported_api_version(cmd, min_api='2017-06-01'):
+        new_rule.redirect_configuration = _sub_resource_or_none(cmd, redirect_config)
+
+    if cmd.supported_api_version(parameter_name='rewrite_rule_set'):
+        new_rule.rewrite_rule_set = _sub_resource_or_none(cmd, rewrite_rule_set)
+    _upsert_in_place(ag, 'request_routing_rules', new_rule)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_request_routing_rule(cmd, instance, parent, item_name, address_pool=None,
                                    http_settings=None, http_listener=None, redirect_config=None, url_path_map=None,
                                    rule_type=None, rewrite_rule_set=None, priority=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if address_pool is not None:
         instance.backend_address_pool = SubResource(id=address_pool)
     if http_settings is not None:
@@ -1450,10 +1480,9 @@ def update_ag_request_routing_rule(cmd, instance, parent, item_name, address_poo
         instance.http_listener = SubResource(id=http_listener)
     if url_path_map is not None:
         instance.url_path_map = SubResource(id=url_path_map)
-    if rule_type is not None:
-        instance.rule_type = rule_type
     if rewrite_rule_set is not None:
         instance.rewrite_rule_set = SubResource(id=rewrite_rule_set)
+    _set_if_not_none(instance, rule_type=rule_type)
     with cmd.update_context(instance) as c:
         c.set_param('priority', priority)
     return parent
@@ -1462,10 +1491,9 @@ def update_ag_request_routing_rule(cmd, instance, parent, item_name, address_poo
 def create_ag_routing_rule(cmd, resource_group_name, application_gateway_name, item_name,
                            address_pool=None, settings=None, listener=None,
                            rule_type='Basic', no_wait=False, priority=None):
-    ApplicationGatewayRoutingRule, SubResource = cmd.get_models(
-        'ApplicationGatewayRoutingRule', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayRoutingRule, SubResource = _get_models(
+        cmd, 'ApplicationGatewayRoutingRule', 'SubResource')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     if not address_pool:
         address_pool = _get_default_id(ag, 'backend_address_pools', '--address-pool')
     if not settings:
@@ -1476,27 +1504,25 @@ def create_ag_routing_rule(cmd, resource_group_name, application_gateway_name, i
         name=item_name,
         rule_type=rule_type,
         priority=priority,
-        backend_address_pool=SubResource(id=address_pool) if address_pool else None,
-        backend_settings=SubResource(id=settings) if settings else None,
+        backend_address_pool=_sub_resource_or_none(cmd, address_pool),
+        backend_settings=_sub_resource_or_none(cmd, settings),
         listener=SubResource(id=listener))
 
-    upsert_to_collection(ag, 'routing_rules', new_rule, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'routing_rules', new_rule)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_routing_rule(cmd, instance, parent, item_name, address_pool=None,
                            settings=None, listener=None,
                            rule_type=None, priority=None):
-    SubResource = cmd.get_models('SubResource')
+    SubResource = _get_models(cmd, 'SubResource')
     if address_pool is not None:
         instance.backend_address_pool = SubResource(id=address_pool)
     if settings is not None:
         instance.backend_settings = SubResource(id=settings)
     if listener is not None:
         instance.listener = SubResource(id=listener)
-    if rule_type is not None:
-        instance.rule_type = rule_type
+    _set_if_not_none(instance, rule_type=rule_type)
     with cmd.update_context(instance) as c:
         c.set_param('priority', priority)
     return parent
@@ -1505,7 +1531,6 @@ def update_ag_routing_rule(cmd, instance, parent, item_name, address_pool=None,
 class SSLCertCreate(_SSLCertCreate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZFileArg, AAZFileArgBase64EncodeFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         args_schema.cert_file = AAZFileArg(
             options=["--cert-file"],
@@ -1524,7 +1549,6 @@ class SSLCertCreate(_SSLCertCreate):
 class SSLCertUpdate(_SSLCertUpdate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZFileArg, AAZFileArgBase64EncodeFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         args_schema.cert_file = AAZFileArg(
             options=["--cert-file"],
@@ -1553,28 +1577,22 @@ class SSLPolicySet(_SSLPolicySet):
 
 def create_ag_trusted_root_certificate(cmd, resource_group_name, application_gateway_name, item_name, no_wait=False,
                                        cert_data=None, keyvault_secret=None):
-    ApplicationGatewayTrustedRootCertificate = cmd.get_models('ApplicationGatewayTrustedRootCertificate')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
-    ag = ncf.get(resource_group_name, application_gateway_name)
+    ApplicationGatewayTrustedRootCertificate = _get_models(cmd, 'ApplicationGatewayTrustedRootCertificate')
+    ag = _get_ag(cmd, resource_group_name, application_gateway_name)
     root_cert = ApplicationGatewayTrustedRootCertificate(name=item_name, data=cert_data,
                                                          key_vault_secret_id=keyvault_secret)
-    upsert_to_collection(ag, 'trusted_root_certificates', root_cert, 'name')
-    return sdk_no_wait(no_wait, ncf.begin_create_or_update,
-                       resource_group_name, application_gateway_name, ag)
+    _upsert_in_place(ag, 'trusted_root_certificates', root_cert)
+    return _put_ag(cmd, resource_group_name, application_gateway_name, ag, no_wait)
 
 
 def update_ag_trusted_root_certificate(instance, parent, item_name, cert_data=None, keyvault_secret=None):
-    if cert_data is not None:
-        instance.data = cert_data
-    if keyvault_secret is not None:
-        instance.key_vault_secret_id = keyvault_secret
+    _set_if_not_none(instance, data=cert_data, key_vault_secret_id=keyvault_secret)
     return parent
 
 
 class URLPathMapCreate(_URLPathMapCreate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZListArg, AAZStrArg, AAZResourceIdArg, AAZResourceIdArgFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         args_schema.rule_name = AAZStrArg(
             options=["--rule-name"],
@@ -1594,37 +1612,25 @@ class URLPathMapCreate(_URLPathMapCreate):
             options=["--address-pool"],
             arg_group="First Rule",
             help="Name or ID of the backend address pool to use with the created rule.",
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/backendAddressPools/{}",
-            ),
+            fmt=_ag_child_fmt("backendAddressPools"),
         )
         args_schema.http_settings = AAZResourceIdArg(
             options=["--http-settings"],
             arg_group="First Rule",
             help="Name or ID of the HTTP settings to use with the created rule.",
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/backendHttpSettingsCollection/{}",
-            ),
+            fmt=_ag_child_fmt("backendHttpSettingsCollection"),
         )
         args_schema.redirect_config = AAZResourceIdArg(
             options=["--redirect-config"],
             arg_group="First Rule",
             help="Name or ID of the redirect configuration to use with the created rule.",
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/redirectConfigurations/{}",
-            ),
+            fmt=_ag_child_fmt("redirectConfigurations"),
         )
         args_schema.rewrite_rule_set = AAZResourceIdArg(
             options=["--rewrite-rule-set"],
             arg_group="First Rule",
             help="Name or ID of the rewrite rule set. If not specified, the default for the map will be used.",
-            fmt=AAZResourceIdArgFormat(
-                template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                         "/applicationGateways/{gateway_name}/rewriteRuleSets/{}",
-            ),
+            fmt=_ag_child_fmt("rewriteRuleSets"),
         )
         args_schema.waf_policy = AAZResourceIdArg(
             options=["--waf-policy"],
@@ -1636,22 +1642,10 @@ class URLPathMapCreate(_URLPathMapCreate):
             ),
         )
         # add templates for resource id
-        args_schema.default_address_pool._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendAddressPools/{}",
-        )
-        args_schema.default_http_settings._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendHttpSettingsCollection/{}",
-        )
-        args_schema.default_redirect_config._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/redirectConfigurations/{}",
-        )
-        args_schema.default_rewrite_rule_set._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/rewriteRuleSets/{}",
-        )
+        args_schema.default_address_pool._fmt = _ag_child_fmt("backendAddressPools")
+        args_schema.default_http_settings._fmt = _ag_child_fmt("backendHttpSettingsCollection")
+        args_schema.default_redirect_config._fmt = _ag_child_fmt("redirectConfigurations")
+        args_schema.default_rewrite_rule_set._fmt = _ag_child_fmt("rewriteRuleSets")
         return args_schema
 
     def pre_operations(self):
@@ -1668,62 +1662,40 @@ class URLPathMapCreate(_URLPathMapCreate):
         args.rules = rules
 
 
+class _EmptyResourceIdArgFormat(AAZResourceIdArgFormat):
+    def __call__(self, ctx, value):
+        if value._data == "":
+            logger.warning("It's recommended to detach it by null, empty string (\"\") will be deprecated.")
+            value._data = None
+        return super().__call__(ctx, value)
+
+
 class URLPathMapUpdate(_URLPathMapUpdate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZResourceIdArgFormat
-
-        class EmptyResourceIdArgFormat(AAZResourceIdArgFormat):
-            def __call__(self, ctx, value):
-                if value._data == "":
-                    logger.warning("It's recommended to detach it by null, empty string (\"\") will be deprecated.")
-                    value._data = None
-                return super().__call__(ctx, value)
-
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         # apply templates for resource id
-        args_schema.default_address_pool._fmt = EmptyResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendAddressPools/{}",
-        )
-        args_schema.default_http_settings._fmt = EmptyResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendHttpSettingsCollection/{}",
-        )
-        args_schema.default_redirect_config._fmt = EmptyResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/redirectConfigurations/{}",
-        )
-        args_schema.default_rewrite_rule_set._fmt = EmptyResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/rewriteRuleSets/{}",
-        )
+        args_schema.default_address_pool._fmt = _ag_child_fmt(
+            "backendAddressPools", fmt_cls=_EmptyResourceIdArgFormat)
+        args_schema.default_http_settings._fmt = _ag_child_fmt(
+            "backendHttpSettingsCollection", fmt_cls=_EmptyResourceIdArgFormat)
+        args_schema.default_redirect_config._fmt = _ag_child_fmt(
+            "redirectConfigurations", fmt_cls=_EmptyResourceIdArgFormat)
+        args_schema.default_rewrite_rule_set._fmt = _ag_child_fmt(
+            "rewriteRuleSets", fmt_cls=_EmptyResourceIdArgFormat)
         return args_schema
 
 
 class URLPathMapRuleCreate(_URLPathMapRuleCreate):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZResourceIdArgFormat
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         args_schema.paths._required = True
         # add templates for resource id
-        args_schema.address_pool._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendAddressPools/{}",
-        )
-        args_schema.http_settings._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/backendHttpSettingsCollection/{}",
-        )
-        args_schema.redirect_config._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/redirectConfigurations/{}",
-        )
-        args_schema.rewrite_rule_set._fmt = AAZResourceIdArgFormat(
-            template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
-                     "/applicationGateways/{gateway_name}/rewriteRuleSets/{}",
-        )
+        args_schema.address_pool._fmt = _ag_child_fmt("backendAddressPools")
+        args_schema.http_settings._fmt = _ag_child_fmt("backendHttpSettingsCollection")
+        args_schema.redirect_config._fmt = _ag_child_fmt("redirectConfigurations")
+        args_schema.rewrite_rule_set._fmt = _ag_child_fmt("rewriteRuleSets")
         args_schema.waf_policy._fmt = AAZResourceIdArgFormat(
             template="/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Network"
                      "/ApplicationGatewayWebApplicationFirewallPolicies/{}",
@@ -1745,7 +1717,11 @@ def set_ag_waf_config(cmd, resource_group_name, application_gateway_name, enable
         "enabled": enabled == "true",
         "firewall_mode": firewall_mode,
         "rule_set_type": rule_set_type,
-        "rule_set_version": rule_set_version
+        "rule_set_version": rule_set_version,
+        "request_body_check": request_body_check,
+        "max_request_body_size_in_kb": max_request_body_size,
+        "file_upload_limit_in_mb": file_upload_limit,
+        "exclusions": exclusions
     }
 
     class WAFConfigSet(_ApplicationGatewayUpdate):
@@ -1754,34 +1730,20 @@ def set_ag_waf_config(cmd, resource_group_name, application_gateway_name, enable
             args.no_wait = no_wait
 
         def pre_instance_update(self, instance):
-            def _flatten(collection, expand_property_fn):
-                for each in collection:
-                    for value in expand_property_fn(each):
-                        yield value
-
             if disabled_rule_groups or disabled_rules:
-                disabled_groups = []
                 # disabled groups can be added directly
-                for group in disabled_rule_groups or []:
-                    disabled_groups.append({"rule_group_name": group})
+                disabled_groups = [{"rule_group_name": group} for group in disabled_rule_groups or []]
                 # for disabled rules, we have to look up the IDs
                 if disabled_rules:
-                    rule_sets = list_ag_waf_rule_sets(cmd, _type=rule_set_type, version=rule_set_version, group='*')
-                    for group in _flatten(rule_sets, lambda r: r["ruleGroups"]):
-                        disabled_group = {
-                            "rule_group_name": group["ruleGroupName"],
-                            "rules": []
-                        }
-                        for rule in group["rules"]:
-                            if str(rule["ruleId"]) in disabled_rules:
-                                disabled_group["rules"].append(rule["ruleId"])
-                        if disabled_group["rules"]:
-                            disabled_groups.append(disabled_group)
+                    disabled_rule_ids = {str(rule_id) for rule_id in disabled_rules}
+                    rule_sets = _list_ag_waf_rule_sets_cached(cmd, rule_set_type, rule_set_version)
+                    rule_groups = _resolve_ag_waf_disabled_rules(rule_sets, disabled_rule_ids)
+                    if len({rule_id for group in rule_groups for rule_id in group["rules"]}) < len(disabled_rule_ids):
+                        # the cached copy may predate rules added by the service, so look them up live once
+                        rule_sets = _list_ag_waf_rule_sets_cached(cmd, rule_set_type, rule_set_version, refresh=True)
+                        rule_groups = _resolve_ag_waf_disabled_rules(rule_sets, disabled_rule_ids)
+                    disabled_groups.extend(rule_groups)
                 waf_config["disabled_rule_groups"] = disabled_groups
-            waf_config["request_body_check"] = request_body_check
-            waf_config["max_request_body_size_in_kb"] = max_request_body_size
-            waf_config["file_upload_limit_in_mb"] = file_upload_limit
-            waf_config["exclusions"] = exclusions
 
             instance.properties.web_application_firewall_configuration = waf_config
 
@@ -1803,27 +1765,73 @@ def list_ag_waf_rule_sets(cmd, _type=None, version=None, group=None):
     from .aaz.latest.network.application_gateway.waf_config import ListRuleSets
     rule_sets = ListRuleSets(cli_ctx=cmd.cli_ctx)(command_args={})["value"]
 
+    type_lc = _type.lower() if _type else None
+    version_lc = version.lower() if version else None
+    group_lc = group.lower() if group else None
+
     filtered_sets = []
-    # filter by rule set name or version
+    # filter by rule set name or version, returning copies so the response itself is left untouched
     for rule_set in rule_sets:
-        if _type and _type.lower() != rule_set["ruleSetType"].lower():
+        if type_lc and type_lc != rule_set["ruleSetType"].lower():
             continue
-        if version and version.lower() != rule_set["ruleSetVersion"].lower():
+        if version_lc and version_lc != rule_set["ruleSetVersion"].lower():
             continue
 
-        filtered_groups = []
-        for rule_group in rule_set["ruleGroups"]:
-            if not group:
-                rule_group["rules"] = None
-                filtered_groups.append(rule_group)
-                continue
-
-            if group.lower() == rule_group["ruleGroupName"].lower() or group == "*":
-                filtered_groups.append(rule_group)
+        if not group:
+            filtered_groups = [{**rule_group, "rules": None} for rule_group in rule_set["ruleGroups"]]
+        elif group == "*":
+            filtered_groups = list(rule_set["ruleGroups"])
+        else:
+            filtered_groups = [rule_group for rule_group in rule_set["ruleGroups"]
+                               if rule_group["ruleGroupName"].lower() == group_lc]
         if filtered_groups:
-            rule_set["ruleGroups"] = filtered_groups
-            filtered_sets.append(rule_set)
+            filtered_sets.append({**rule_set, "ruleGroups": filtered_groups})
     return filtered_sets
+
+
+_WAF_RULE_SETS_CACHE_TTL_DAYS = 7
+
+
+def _resolve_ag_waf_disabled_rules(rule_sets, disabled_rule_ids):
+    disabled_groups = []
+    for rule_set in rule_sets:
+        for group in rule_set["ruleGroups"]:
+            rules = [rule["ruleId"] for rule in group["rules"] or [] if str(rule["ruleId"]) in disabled_rule_ids]
+            if rules:
+                disabled_groups.append({"rule_group_name": group["ruleGroupName"], "rules": rules})
+    return disabled_groups
+
+
+def _list_ag_waf_rule_sets_cached(cmd, rule_set_type, rule_set_version, refresh=False):
+    """ Same as `list_ag_waf_rule_sets(cmd, rule_set_type, rule_set_version, group='*')`, but reuses a copy kept
+    under the CLI config directory for a week, since the available rule sets only change with service releases.
+    With `refresh` the copy is ignored and rewritten from a live listing. """
+    import json
+    import os
+    from datetime import datetime, timedelta
+    from azure.cli.core._environment import get_config_dir
+
+    time_format = "%Y-%m-%dT%H:%M:%S.%f"
+    cache_path = os.path.join(get_config_dir(), "wafRuleSets", "{}_{}_{}.json".format(
+        cmd.cli_ctx.cloud.name, rule_set_type, rule_set_version or "all").lower())
+    if not refresh:
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            last_saved = datetime.strptime(cached["lastSaved"], time_format)
+            if datetime.now() - last_saved <= timedelta(days=_WAF_RULE_SETS_CACHE_TTL_DAYS):
+                return cached["ruleSets"]
+        except (IOError, ValueError, KeyError):
+            logger.debug("WAF rule sets not found in cache. Retrieving from Azure...")
+
+    rule_sets = list_ag_waf_rule_sets(cmd, _type=rule_set_type, version=rule_set_version, group='*')
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump({"lastSaved": datetime.now().strftime(time_format), "ruleSets": rule_sets}, f)
+    except (IOError, TypeError) as ex:
+        logger.debug("Unable to cache WAF rule sets: %s", ex)
+    return rule_sets
 # endregion
 
 
@@ -1841,9 +1849,7 @@ def create_ag_waf_policy(cmd, resource_group_name, policy_name,
         "managed_rule_sets": [managed_rule_set]
     }
 
-    from .aaz.latest.network.application_gateway.waf_policy import Create
-
-    return Create(cli_ctx=cmd.cli_ctx)(command_args={
+    return _WAFPolicyCreate(cli_ctx=cmd.cli_ctx)(command_args={
         "resource_group": resource_group_name,
         "name": policy_name,
         "location": location,
@@ -1885,7 +1891,6 @@ def list_waf_policy_setting(cmd, client, resource_group_name, policy_name):
 class WAFCustomRuleMatchConditionAdd(_WAFCustomRuleMatchConditionAdd):
     @classmethod
     def _build_arguments_schema(cls, *args, **kwargs):
-        from azure.cli.core.aaz import AAZListArg, AAZStrArg
         args_schema = super()._build_arguments_schema(*args, **kwargs)
         args_schema.match_variables = AAZListArg(
             options=["--match-variables"],
@@ -1903,19 +1908,17 @@ class WAFCustomRuleMatchConditionAdd(_WAFCustomRuleMatchConditionAdd):
         args = self.ctx.args
         variables = []
         for variable in args.match_variables:
-            try:
-                name, selector = str(variable).split(".", 1)
-            except ValueError:
-                name, selector = variable, None
+            name, sep, selector = str(variable).partition(".")
             variables.append({
                 "variable_name": name,
-                "selector": selector,
+                "selector": selector if sep else None,
             })
         args.variables = variables
         # validate
-        if str(args.operator).lower() == "any" and has_value(args.values):
+        is_any_operator = str(args.operator).lower() == "any"
+        if is_any_operator and has_value(args.values):
             raise ArgumentUsageError("Any operator does not require --match-values.")
-        if str(args.operator).lower() != "any" and not has_value(args.values):
+        if not is_any_operator and not has_value(args.values):
             raise ArgumentUsageError("Non-any operator requires --match-values.")
 # endregion
 
@@ -1927,50 +1930,46 @@ def add_waf_managed_rule_set(cmd, resource_group_name, policy_name,
     Add managed rule set to the WAF policy managed rules.
     Visit: https://docs.microsoft.com/en-us/azure/web-application-firewall/ag/application-gateway-crs-rulegroups-rules
     """
-    if rules is None:
-        managed_rule_overrides = []
-    else:
-        managed_rule_overrides = rules
+    managed_rule_overrides = rules or []
 
-    rule_group_override = None
-    if rule_group_name is not None:
-        rule_group_override = {
-            "rule_group_name": rule_group_name,
-            "rules": managed_rule_overrides
-        }
-
-    if rule_group_override is None:
-        rule_group_overrides = []
-    else:
-        rule_group_overrides = [rule_group_override]
+    rule_group_override = {
+        "rule_group_name": rule_group_name,
+        "rules": managed_rule_overrides
+    } if rule_group_name is not None else None
 
     new_managed_rule_set = {
         "rule_set_type": rule_set_type,
         "rule_set_version": rule_set_version,
-        "rule_group_overrides": rule_group_overrides
+        "rule_group_overrides": [rule_group_override] if rule_group_override is not None else []
     }
 
-    from .aaz.latest.network.application_gateway.waf_policy import Update
-
-    class WAFManagedRuleSetAdd(Update):
-        def pre_instance_update(self, instance):
-            for rule_set in instance.properties.managed_rules.managed_rule_sets:
-                if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
-                    for rule_override in rule_set.rule_group_overrides:
-                        if rule_override.rule_group_name == rule_group_name:
-                            # add one rule
-                            rule_override.rules.extend(managed_rule_overrides)
-                            break
-                    else:
-                        # add one rule group
-                        if rule_group_override is not None:
-                            rule_set.rule_group_overrides.append(rule_group_override)
-                    break
-            else:
-                # add new rule set
-                instance.properties.managed_rules.managed_rule_sets.append(new_managed_rule_set)
+    def pre_instance_update(instance, ctx):  # pylint: disable=unused-argument
+        managed_rule_sets = instance.properties.managed_rules.managed_rule_sets
+        rule_set = next((rs for rs in managed_rule_sets
+                         if rs.rule_set_type == rule_set_type and rs.rule_set_version == rule_set_version), None)
+        if rule_set is None:
+            # add new rule set
+            managed_rule_sets.append(new_managed_rule_set)
+            return
+
+        rule_override = next((g for g in rule_set.rule_group_overrides if g.rule_group_name == rule_group_name),
+                             None)
+        if rule_override is not None:
+            # replace the rules that are already overridden and add the others,
+            # AAZ values are unhashable so key on their raw data
+            rule_indexes = {r.rule_id.to_serialized_data(): i for i, r in enumerate(rule_override.rules)}
+            for rule in managed_rule_overrides:
+                if rule['rule_id'] in rule_indexes:
+                    logger.warning("Rule '%s' is already overridden. Replacing with new values.", rule['rule_id'])
+                    rule_override.rules[rule_indexes[rule['rule_id']]] = rule
+                else:
+                    rule_indexes[rule['rule_id']] = len(rule_override.rules)
+                    rule_override.rules.append(rule)
+        elif rule_group_override is not None:
+            # add one rule group
+            rule_set.rule_group_overrides.append(rule_group_override)
 
-    return WAFManagedRuleSetAdd(cli_ctx=cmd.cli_ctx)(command_args={
+    return _WAFPolicyUpdate(cli_ctx=cmd.cli_ctx, callbacks={'pre_instance_update': pre_instance_update})(command_args={
         "resource_group": resource_group_name,
         "name": policy_name
     })
@@ -1988,50 +1987,37 @@ def update_waf_managed_rule_set(cmd, resource_group_name, policy_name,
         "rules": managed_rule_overrides
     } if managed_rule_overrides else None
 
-    if rule_group_override is None:
-        rule_group_overrides = []
-    else:
-        rule_group_overrides = [rule_group_override]
-
     new_managed_rule_set = {
         "rule_set_type": rule_set_type,
         "rule_set_version": rule_set_version,
-        "rule_group_overrides": rule_group_overrides
+        "rule_group_overrides": [rule_group_override] if rule_group_override is not None else []
     }
 
-    from .aaz.latest.network.application_gateway.waf_policy import Update
-
-    class WAFManagedRuleSetUpdate(Update):
-        def pre_instance_update(self, instance):
-            updated_rule_set = None
-            for rule_set in instance.properties.managed_rules.managed_rule_sets:
-                if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version != rule_set_version:
-                    updated_rule_set = rule_set
+    def pre_instance_update(instance, ctx):  # pylint: disable=unused-argument
+        managed_rule_sets = instance.properties.managed_rules.managed_rule_sets
+        updated_index = None
+        for index, rule_set in enumerate(managed_rule_sets):
+            if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version != rule_set_version:
+                updated_index = index
+                break
+
+            if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
+                if rule_group_name is None:
+                    updated_index = index
                     break
 
-                if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
-                    if rule_group_name is None:
-                        updated_rule_set = rule_set
-                        break
-
-                    rg = next((g for g in rule_set.rule_group_overrides if g.rule_group_name == rule_group_name), None)
-                    if rg:
-                        rg.rules = managed_rule_overrides
-                    else:
-                        rule_set.rule_group_overrides.append(rule_group_override)
-
-            if updated_rule_set:
-                new_managed_rule_sets = []
-                for rule_set in instance.properties.managed_rules.managed_rule_sets:
-                    if rule_set == updated_rule_set:
-                        continue
-
-                    new_managed_rule_sets.append(rule_set)
-                new_managed_rule_sets.append(new_managed_rule_set)
+                rg = next((g for g in rule_set.rule_group_overrides if g.rule_group_name == rule_group_name), None)
+                if rg:
+                    rg.rules = managed_rule_overrides
+                else:
+                    rule_set.rule_group_overrides.append(rule_group_override)
 
-                instance.properties.managed_rules.managed_rule_sets = new_managed_rule_sets
+        if updated_index is not None:
+            # AAZ lists hand out a fresh wrapper per access, so drop the replaced rule set by position
+            del managed_rule_sets[updated_index]
+            managed_rule_sets.append(new_managed_rule_set)
 
-    return WAFManagedRuleSetUpdate(cli_ctx=cmd.cli_ctx)(command_args={
+    return _WAFPolicyUpdate(cli_ctx=cmd.cli_ctx, callbacks={'pre_instance_update': pre_instance_update})(command_args={
         "resource_group": resource_group_name,
         "name": policy_name
     })
@@ -2042,51 +2028,31 @@ def remove_waf_managed_rule_set(cmd, resource_group_name, policy_name,
     """
     Remove a managed rule set by rule set group name if rule_group_name is specified. Otherwise, remove all rule set.
     """
-    from .aaz.latest.network.application_gateway.waf_policy import Update
-
-    class WAFManagedRuleSetRemove(Update):
-        def pre_instance_update(self, instance):
-            delete_rule_set = None
-            for rule_set in instance.properties.managed_rules.managed_rule_sets:
-                if rule_set.rule_set_type == rule_set_type or rule_set.rule_set_version == rule_set_version:
-                    if rule_group_name is None:
-                        delete_rule_set = rule_set
-                        break
-                    # remove one rule from rule group
-                    is_removed = False
-                    new_rule_group_overrides = []
-                    for rg in rule_set.rule_group_overrides:
-                        if rg.rule_group_name == rule_group_name and not is_removed:
-                            is_removed = True
-                            continue
-
-                        new_rule_group_overrides.append(rg)
-                    if not is_removed:
-                        err_msg = f"Rule set group [{rule_group_name}] is not found."
-                        raise ResourceNotFoundError(err_msg)
-
-                    rule_set.rule_group_overrides = new_rule_group_overrides
-
-            if delete_rule_set:
-                new_managed_rule_sets = []
-                for rule_set in instance.properties.managed_rules.managed_rule_sets:
-                    if rule_set == delete_rule_set:
-                        continue
-
-                    new_managed_rule_sets.append(rule_set)
+    def pre_instance_update(instance, ctx):  # pylint: disable=unused-argument
+        managed_rule_sets = instance.properties.managed_rules.managed_rule_sets
+        for index, rule_set in enumerate(managed_rule_sets):
+            if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
+                if rule_group_name is None:
+                    del managed_rule_sets[index]
+                    break
+                # remove one rule from rule group
+                rule_group_index = next((i for i, rg in enumerate(rule_set.rule_group_overrides)
+                                         if rg.rule_group_name == rule_group_name), None)
+                if rule_group_index is None:
+                    err_msg = f"Rule set group [{rule_group_name}] is not found."
+                    raise ResourceNotFoundError(err_msg)
 
-                instance.properties.managed_rules.managed_rule_sets = new_managed_rule_sets
+                del rule_set.rule_group_overrides[rule_group_index]
+                break
 
-    return WAFManagedRuleSetRemove(cli_ctx=cmd.cli_ctx)(command_args={
+    return _WAFPolicyUpdate(cli_ctx=cmd.cli_ctx, callbacks={'pre_instance_update': pre_instance_update})(command_args={
         "resource_group": resource_group_name,
         "name": policy_name
     })
 
 
 def list_waf_managed_rule_set(cmd, resource_group_name, policy_name):
-    from .aaz.latest.network.application_gateway.waf_policy import Show
-
-    return Show(cli_ctx=cmd.cli_ctx)(command_args={
+    return _WAFPolicyShow(cli_ctx=cmd.cli_ctx)(command_args={
         "resource_group": resource_group_name,
         "name": policy_name
     })["managedRules"]
@@ -2125,15 +2091,6 @@ def add_waf_exclusion_rule_set(cmd, client, resource_group_name, policy_name,
                                rule_set_type, rule_set_version,
                                match_variable, selector_match_operator, selector,
                                rule_group_name=None, rule_ids=None):
-    def _has_exclusion():
-        policy = client.get(resource_group_name, policy_name)
-        for e in policy.managed_rules.exclusions:
-            if e.match_variable == match_variable \
-                    and e.selector_match_operator == selector_match_operator \
-                    and e.selector == selector:
-                return True
-        return False
-
     ExclusionManagedRuleSet, ExclusionManagedRuleGroup, ExclusionManagedRule = cmd.get_models(
         'ExclusionManagedRuleSet', 'ExclusionManagedRuleGroup', 'ExclusionManagedRule'
     )
@@ -2148,35 +2105,32 @@ def add_waf_exclusion_rule_set(cmd, client, resource_group_name, policy_name,
                                             rule_set_version=rule_set_version,
                                             rule_groups=[curr_rule_group] if curr_rule_group is not None else [])
 
-    if not _has_exclusion():
+    # a single GET both tells whether the exclusion exists and provides the policy to update
+    waf_policy = client.get(resource_group_name, policy_name)
+    exclusion = {(e.match_variable, e.selector_match_operator, e.selector): e
+                 for e in waf_policy.managed_rules.exclusions}.get((match_variable, selector_match_operator, selector))
+    if exclusion is None:
         OwaspCrsExclusionEntry = cmd.get_models('OwaspCrsExclusionEntry')
         exclusion = OwaspCrsExclusionEntry(match_variable=match_variable,
                                            selector_match_operator=selector_match_operator,
                                            selector=selector,
                                            exclusion_managed_rule_sets=[curr_rule_set])
-        waf_policy = client.get(resource_group_name, policy_name)
         waf_policy.managed_rules.exclusions.append(exclusion)
     else:
-        waf_policy = client.get(resource_group_name, policy_name)
-        for exclusion in waf_policy.managed_rules.exclusions:
-            if exclusion.match_variable == match_variable \
-                    and exclusion.selector_match_operator == selector_match_operator \
-                    and exclusion.selector == selector:
-                for rule_set in exclusion.exclusion_managed_rule_sets:
-                    if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
-                        for rule_group in rule_set.rule_groups:
-                            # add rules when rule group exists
-                            if rule_group.rule_group_name == rule_group_name:
-                                rule_group.rules.extend(rules)
-                                break
-                        else:
-                            # add a new rule group
-                            if curr_rule_group is not None:
-                                rule_set.rule_groups.append(curr_rule_group)
-                        break
-                else:
-                    # add a new rule set
-                    exclusion.exclusion_managed_rule_sets.append(curr_rule_set)
+        rule_set = {(rs.rule_set_type, rs.rule_set_version): rs
+                    for rs in exclusion.exclusion_managed_rule_sets}.get((rule_set_type, rule_set_version))
+        if rule_set is None:
+            # add a new rule set
+            exclusion.exclusion_managed_rule_sets.append(curr_rule_set)
+        else:
+            rule_group = {rg.rule_group_name: rg for rg in rule_set.rule_groups}.get(rule_group_name)
+            if rule_group is not None:
+                # add rules when rule group exists
+                existing_rule_ids = {r.rule_id for r in rule_group.rules}
+                rule_group.rules.extend(r for r in rules if r.rule_id not in existing_rule_ids)
+            elif curr_rule_group is not None:
+                # add a new rule group
+                rule_set.rule_groups.append(curr_rule_group)
 
     return client.create_or_update(resource_group_name, policy_name, waf_policy)
 
@@ -2190,30 +2144,31 @@ def remove_waf_exclusion_rule_set(client, resource_group_name, policy_name,
     remove_exclusion = None
     waf_policy = client.get(resource_group_name, policy_name)
 
-    for exclusion in waf_policy.managed_rules.exclusions:
-        if (exclusion.match_variable, exclusion.selector_match_operator, exclusion.selector) \
-           == (match_variable, selector_match_operator, selector):
-            for rule_set in exclusion.exclusion_managed_rule_sets:
-                if rule_set.rule_set_type == rule_set_type or rule_set.rule_set_version == rule_set_version:
-                    if rule_group_name is None:
-                        remove_rule_set = rule_set
-                        break
-
-                    rule_group = next((rule_group for rule_group in rule_set.rule_groups if rule_group.rule_group_name == rule_group_name), None)
-                    if rule_group is None:
-                        err_msg = f"Rule set group [{rule_group_name}] is not found."
-                        raise ResourceNotFoundError(err_msg)
-
-                    rule_set.rule_groups.remove(rule_group)
-                    if not rule_set.rule_groups:
-                        exclusion.exclusion_managed_rule_sets.remove(rule_set)
-                        if not exclusion.exclusion_managed_rule_sets:
-                            remove_exclusion = exclusion
-
-            if remove_rule_set:
-                exclusion.exclusion_managed_rule_sets.remove(remove_rule_set)
-                if not exclusion.exclusion_managed_rule_sets:
-                    remove_exclusion = exclusion
+    exclusion = {(e.match_variable, e.selector_match_operator, e.selector): e
+                 for e in waf_policy.managed_rules.exclusions}.get((match_variable, selector_match_operator, selector))
+    if exclusion is not None:
+        for rule_set in exclusion.exclusion_managed_rule_sets:
+            if rule_set.rule_set_type == rule_set_type and rule_set.rule_set_version == rule_set_version:
+                if rule_group_name is None:
+                    remove_rule_set = rule_set
+                    break
+
+                rule_group = next((rule_group for rule_group in rule_set.rule_groups if rule_group.rule_group_name == rule_group_name), None)
+                if rule_group is None:
+                    err_msg = f"Rule set group [{rule_group_name}] is not found."
+                    raise ResourceNotFoundError(err_msg)
+
+                rule_set.rule_groups.remove(rule_group)
+                if not rule_set.rule_groups:
+                    exclusion.exclusion_managed_rule_sets.remove(rule_set)
+                    if not exclusion.exclusion_managed_rule_sets:
+                        remove_exclusion = exclusion
+                break
+
+        if remove_rule_set:
+            exclusion.exclusion_managed_rule_sets.remove(remove_rule_set)
+            if not exclusion.exclusion_managed_rule_sets:
+                remove_exclusion = exclusion
 
     if remove_exclusion:
         waf_policy.managed_rules.exclusions.remove(remove_exclusion)
@@ -2228,6 +2183,25 @@ def list_waf_exclusion_rule_set(cmd, client, resource_group_name, policy_name):
 
 
 # region DdosProtectionPlans
+def _set_vnets_ddos_plan(cmd, vnet_plan_ids):
+    """ Point each VNet id in `vnet_plan_ids` at its DDoS protection plan id, or detach it when that is None. """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    if not vnet_plan_ids:
+        return
+    client = _cached_network_client(cmd.cli_ctx).virtual_networks
+
+    def _set_vnet_ddos_plan(vnet_id, plan_id):
+        id_parts = parse_resource_id(vnet_id)
+        vnet = client.get(id_parts['resource_group'], id_parts['name'])
+        vnet.ddos_protection_plan = _sub_resource_or_none(cmd, plan_id)
+        client.begin_create_or_update(id_parts['resource_group'], id_parts['name'], vnet)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        tasks = [executor.submit(_set_vnet_ddos_plan, vnet_id, plan_id) for vnet_id, plan_id in vnet_plan_ids.items()]
+        for t in as_completed(tasks):
+            t.result()  # don't use the result but expose exceptions from the threads
+
+
 def create_ddos_plan(cmd, resource_group_name, ddos_plan_name, location=None, tags=None, vnets=None):
     from azure.cli.core.commands import LongRunningOperation
     from azure.cli.command_modules.network.aaz.latest.network.ddos_protection import Create
@@ -2247,14 +2221,8 @@ def create_ddos_plan(cmd, resource_group_name, ddos_plan_name, location=None, ta
     # if VNETs specified, have to create the protection plan and then add the VNETs
     plan_id = LongRunningOperation(cmd.cli_ctx)(Create_Ddos_Protection(args))['id']
 
-    SubResource = cmd.get_models('SubResource')
     logger.info('Attempting to attach VNets to newly created DDoS protection plan.')
-    for vnet_subresource in vnets:
-        vnet_client = network_client_factory(cmd.cli_ctx).virtual_networks
-        id_parts = parse_resource_id(vnet_subresource.id)
-        vnet = vnet_client.get(id_parts['resource_group'], id_parts['name'])
-        vnet.ddos_protection_plan = SubResource(id=plan_id)
-        vnet_client.begin_create_or_update(id_parts['resource_group'], id_parts['name'], vnet)
+    _set_vnets_ddos_plan(cmd, {x.id: plan_id for x in vnets})
 
     show_args = {
         "name": ddos_plan_name,
@@ -2266,7 +2234,6 @@ def create_ddos_plan(cmd, resource_group_name, ddos_plan_name, location=None, ta
 
 
 def update_ddos_plan(cmd, resource_group_name, ddos_plan_name, tags=None, vnets=None):
-    SubResource = cmd.get_models('SubResource')
     from azure.cli.command_modules.network.aaz.latest.network.ddos_protection import Update
     Update_Ddos_Protection = Update(cli_ctx=cmd.cli_ctx)
     args = {
@@ -2284,28 +2251,18 @@ def update_ddos_plan(cmd, resource_group_name, ddos_plan_name, tags=None, vnets=
         Show_Ddos_Protection = Show(cli_ctx=cmd.cli_ctx)
         show_args = Show_Ddos_Protection(show_args)
         logger.info('Attempting to update the VNets attached to the DDoS protection plan.')
-        vnet_ids = set([])
-        if len(vnets) == 1 and not vnets[0]:
-            pass
-        else:
-            vnet_ids = {x.id for x in vnets}
-        if 'virtualNetworks' in show_args:
-            existing_vnet_ids = {x['id'] for x in show_args['virtualNetworks']}
-        else:
-            existing_vnet_ids = set([])
-        client = network_client_factory(cmd.cli_ctx).virtual_networks
+        # `--vnets ""` detaches every VNet
+        vnet_ids = {x.id for x in vnets if x}
+        existing_vnet_ids = {x['id'] for x in show_args.get('virtualNetworks', ())}
+        vnet_plan_ids = {}
         for vnet_id in vnet_ids.difference(existing_vnet_ids):
             logger.info("Adding VNet '%s' to plan.", vnet_id)
-            id_parts = parse_resource_id(vnet_id)
-            vnet = client.get(id_parts['resource_group'], id_parts['name'])
-            vnet.ddos_protection_plan = SubResource(id=show_args['id'])
-            client.begin_create_or_update(id_parts['resource_group'], id_parts['name'], vnet)
+            vnet_plan_ids[vnet_id] = show_args['id']
         for vnet_id in existing_vnet_ids.difference(vnet_ids):
             logger.info("Removing VNet '%s' from plan.", vnet_id)
-            id_parts = parse_resource_id(vnet_id)
-            vnet = client.get(id_parts['resource_group'], id_parts['name'])
-            vnet.ddos_protection_plan = None
-            client.begin_create_or_update(id_parts['resource_group'], id_parts['name'], vnet)
+            vnet_plan_ids[vnet_id] = None
+        # attach and detach in one round so the two sets of VNet calls overlap
+        _set_vnets_ddos_plan(cmd, vnet_plan_ids)
     return Update_Ddos_Protection(args)
 
 
@@ -2327,8 +2284,6 @@ def add_dns_delegation(cmd, child_zone, parent_zone, child_rg, child_zone_name):
      :param child_rg: resource group of the child zone
      :param child_zone_name: name of the child zone
     """
-    import sys
-    from azure.core.exceptions import HttpResponseError
     parent_rg = child_rg
     parent_subscription_id = None
     parent_zone_name = parent_zone
@@ -2430,32 +2385,62 @@ def update_dns_record_set(instance, cmd, metadata=None, target_resource=None):
     return instance
 
 
+_RECORD_SET_PROPERTY_NAMES = {
+    'a': 'a_records',
+    'aaaa': 'aaaa_records',
+    'caa': 'caa_records',
+    'cname': 'cname_record',
+    'mx': 'mx_records',
+    'ns': 'ns_records',
+    'ptr': 'ptr_records',
+    'soa': 'soa_record',
+    'spf': 'txt_records',
+    'srv': 'srv_records',
+    'txt': 'txt_records',
+    'alias': 'target_resource',
+}
+
+
 def _type_to_property_name(key):
-    type_dict = {
-        'a': 'a_records',
-        'aaaa': 'aaaa_records',
-        'caa': 'caa_records',
-        'cname': 'cname_record',
-        'mx': 'mx_records',
-        'ns': 'ns_records',
-        'ptr': 'ptr_records',
-        'soa': 'soa_record',
-        'spf': 'txt_records',
-        'srv': 'srv_records',
-        'txt': 'txt_records',
-        'alias': 'target_resource',
-    }
-    return type_dict[key.lower()]
+    return _RECORD_SET_PROPERTY_NAMES[key.lower()]
 
 
-def export_zone(cmd, resource_group_name, zone_name, file_name=None):  # pylint: disable=too-many-branches
-    from time import localtime, strftime
+def _fqdn(name):
+    return name if name.endswith('.') else name.rstrip('.') + '.'
+
+
+# zone file fields of each exported record, keyed by record type
+_RECORD_EXPORTERS = {
+    'a': lambda r: {'ip': r.ipv4_address},
+    'aaaa': lambda r: {'ip': r.ipv6_address},
+    'caa': lambda r: {'val': r.value, 'tag': r.tag, 'flags': r.flags},
+    'cname': lambda r: {'alias': _fqdn(r.cname)},
+    'mx': lambda r: {'preference': r.preference, 'host': _fqdn(r.exchange)},
+    'ns': lambda r: {'host': _fqdn(r.nsdname)},
+    'ptr': lambda r: {'host': _fqdn(r.ptrdname)},
+    'soa': lambda r: {
+        'mname': _fqdn(r.host),
+        'rname': _fqdn(r.email),
+        'serial': int(r.serial_number), 'refresh': r.refresh_time,
+        'retry': r.retry_time, 'expire': r.expire_time,
+        'minimum': r.minimum_ttl
+    },
+    'srv': lambda r: {'priority': r.priority, 'weight': r.weight,
+                      'port': r.port, 'target': _fqdn(r.target)},
+    'txt': lambda r: {'txt': ''.join(r.value)},
+}
+
+
+# record types that can be an alias to an Azure resource instead of holding records
+_ALIAS_RECORD_TYPES = frozenset(('a', 'aaaa', 'cname'))
 
+
+def export_zone(cmd, resource_group_name, zone_name, file_name=None):  # pylint: disable=too-many-branches
     client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS)
     record_sets = client.record_sets.list_by_dns_zone(resource_group_name, zone_name)
 
     zone_obj = OrderedDict({
-        '$origin': zone_name.rstrip('.') + '.',
+        '$origin': _fqdn(zone_name),
         'resource-group': resource_group_name,
         'zone-name': zone_name.rstrip('.'),
         'datetime': strftime('%a, %d %b %Y %X %z', localtime())
@@ -2464,149 +2449,95 @@ def export_zone(cmd, resource_group_name, zone_name, file_name=None):  # pylint:
     for record_set in record_sets:
         record_type = record_set.type.rsplit('/', 1)[1].lower()
         record_set_name = record_set.name
-        record_data = getattr(record_set, _type_to_property_name(record_type), None)
+        record_data = getattr(record_set, _RECORD_SET_PROPERTY_NAMES[record_type], None)
+        ttl = record_set.ttl
 
-        if not record_data:
-            record_data = []
         if not isinstance(record_data, list):
-            record_data = [record_data]
-
-        if record_set_name not in zone_obj:
-            zone_obj[record_set_name] = OrderedDict()
-
-        for record in record_data:
-            record_obj = {'ttl': record_set.ttl}
-
-            if record_type not in zone_obj[record_set_name]:
-                zone_obj[record_set_name][record_type] = []
-            if record_type == 'aaaa':
-                record_obj.update({'ip': record.ipv6_address})
-            elif record_type == 'a':
-                record_obj.update({'ip': record.ipv4_address})
-            elif record_type == 'caa':
-                record_obj.update({'val': record.value, 'tag': record.tag, 'flags': record.flags})
-            elif record_type == 'cname':
-                record_obj.update({'alias': record.cname.rstrip('.') + '.'})
-            elif record_type == 'mx':
-                record_obj.update({'preference': record.preference, 'host': record.exchange.rstrip('.') + '.'})
-            elif record_type == 'ns':
-                record_obj.update({'host': record.nsdname.rstrip('.') + '.'})
-            elif record_type == 'ptr':
-                record_obj.update({'host': record.ptrdname.rstrip('.') + '.'})
-            elif record_type == 'soa':
-                record_obj.update({
-                    'mname': record.host.rstrip('.') + '.',
-                    'rname': record.email.rstrip('.') + '.',
-                    'serial': int(record.serial_number), 'refresh': record.refresh_time,
-                    'retry': record.retry_time, 'expire': record.expire_time,
-                    'minimum': record.minimum_ttl
-                })
-                zone_obj['$ttl'] = record.minimum_ttl
-            elif record_type == 'srv':
-                record_obj.update({'priority': record.priority, 'weight': record.weight,
-                                   'port': record.port, 'target': record.target.rstrip('.') + '.'})
-            elif record_type == 'txt':
-                record_obj.update({'txt': ''.join(record.value)})
-            zone_obj[record_set_name][record_type].append(record_obj)
-
-        if len(record_data) == 0:
-            record_obj = {'ttl': record_set.ttl}
-
-            if record_type not in zone_obj[record_set_name]:
-                zone_obj[record_set_name][record_type] = []
+            record_data = (record_data,) if record_data else ()
+
+        record_set_obj = zone_obj.setdefault(record_set_name, OrderedDict())
+
+        if record_data:
+            exporter = _RECORD_EXPORTERS.get(record_type, lambda _: {})
+            record_set_obj.setdefault(record_type, []).extend({'ttl': ttl, **exporter(r)} for r in record_data)
+            if record_type == 'soa':
+                zone_obj['$ttl'] = record_data[-1].minimum_ttl
+        else:
+            record_obj = {'ttl': ttl}
+
+            records = record_set_obj.setdefault(record_type, [])
             # Checking for alias record
-            if (record_type == 'a' or record_type == 'aaaa' or record_type == 'cname') and record_set.target_resource.id:
-                target_resource_id = record_set.target_resource.id
-                record_obj.update({'target-resource-id': record_type.upper() + " " + target_resource_id})
-                record_type = 'alias'
-                zone_obj[record_set_name][record_type] = []
-            elif record_type == 'aaaa' or record_type == 'a':
-                record_obj.update({'ip': ''})
+            if record_type in _ALIAS_RECORD_TYPES and record_set.target_resource.id:
+                record_obj['target-resource-id'] = record_type.upper() + " " + record_set.target_resource.id
+                records = record_set_obj['alias'] = []
+            elif record_type in ('a', 'aaaa'):
+                record_obj['ip'] = ''
             elif record_type == 'cname':
-                record_obj.update({'alias': ''})
-            zone_obj[record_set_name][record_type].append(record_obj)
+                record_obj['alias'] = ''
+            records.append(record_obj)
+    if not file_name:
+        # nothing else needs the content, so stream it instead of building it in memory first
+        make_zone_file(zone_obj, out=sys.stdout)
+        print()
+        return
+
     zone_file_content = make_zone_file(zone_obj)
     print(zone_file_content)
-    if file_name:
-        try:
-            with open(file_name, 'w') as f:
-                f.write(zone_file_content)
-        except IOError:
-            raise CLIError('Unable to export to file: {}'.format(file_name))
+    try:
+        with open(file_name, 'w') as f:
+            f.write(zone_file_content)
+    except IOError:
+        raise CLIError('Unable to export to file: {}'.format(file_name))
+
+
+def _build_txt_record(model, data):
+    text_data = data['txt']
+    return model(value=text_data) if isinstance(text_data, list) else model(value=[text_data])
+
+
+# model name and constructor of each importable record, keyed by the record type of the zone file entry
+_RECORD_BUILDERS = {
+    'aaaa': ('AaaaRecord', lambda model, data: model(ipv6_address=data['ip'])),
+    'a': ('ARecord', lambda model, data: model(ipv4_address=data['ip'])),
+    'caa': ('CaaRecord', lambda model, data: model(value=data['val'], flags=int(data['flags']), tag=data['tag'])),
+    'cname': ('CnameRecord', lambda model, data: model(cname=data['alias'])),
+    'mx': ('MxRecord', lambda model, data: model(preference=data['preference'], exchange=data['host'])),
+    'ns': ('NsRecord', lambda model, data: model(nsdname=data['host'])),
+    'ptr': ('PtrRecord', lambda model, data: model(ptrdname=data['host'])),
+    'soa': ('SoaRecord', lambda model, data: model(
+        host=data['host'], email=data['email'], serial_number=data['serial'], refresh_time=data['refresh'],
+        retry_time=data['retry'], expire_time=data['expire'], minimum_ttl=data['minimum'])),
+    'srv': ('SrvRecord', lambda model, data: model(
+        priority=int(data['priority']), weight=int(data['weight']), port=int(data['port']), target=data['target'])),
+    'txt': ('TxtRecord', _build_txt_record),
+    'spf': ('TxtRecord', _build_txt_record),
+    'alias': ('SubResource', lambda model, data: model(id=data["resourceId"])),
+}
 
 
-# pylint: disable=too-many-return-statements, inconsistent-return-statements, too-many-branches
 def _build_record(cmd, data):
-    (
-        AaaaRecord,
-        ARecord,
-        CaaRecord,
-        CnameRecord,
-        MxRecord,
-        NsRecord,
-        PtrRecord,
-        SoaRecord,
-        SrvRecord,
-        TxtRecord,
-        SubResource,
-    ) = cmd.get_models(
-        "AaaaRecord",
-        "ARecord",
-        "CaaRecord",
-        "CnameRecord",
-        "MxRecord",
-        "NsRecord",
-        "PtrRecord",
-        "SoaRecord",
-        "SrvRecord",
-        "TxtRecord",
-        "SubResource",
-        resource_type=ResourceType.MGMT_NETWORK_DNS,
-    )
     record_type = data['delim'].lower()
+    builder = _RECORD_BUILDERS.get(record_type)
+    if builder is None or (record_type == 'caa' and not _supported_api_version(
+            cmd, ResourceType.MGMT_NETWORK_DNS, min_api='2018-03-01-preview')):
+        return None
+    model_name, build = builder
     try:
-        if record_type == 'aaaa':
-            return AaaaRecord(ipv6_address=data['ip'])
-        if record_type == 'a':
-            return ARecord(ipv4_address=data['ip'])
-        if (record_type == 'caa' and
-                supported_api_version(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS, min_api='2018-03-01-preview')):
-            return CaaRecord(value=data['val'], flags=int(data['flags']), tag=data['tag'])
-        if record_type == 'cname':
-            return CnameRecord(cname=data['alias'])
-        if record_type == 'mx':
-            return MxRecord(preference=data['preference'], exchange=data['host'])
-        if record_type == 'ns':
-            return NsRecord(nsdname=data['host'])
-        if record_type == 'ptr':
-            return PtrRecord(ptrdname=data['host'])
-        if record_type == 'soa':
-            return SoaRecord(host=data['host'], email=data['email'], serial_number=data['serial'],
-                             refresh_time=data['refresh'], retry_time=data['retry'], expire_time=data['expire'],
-                             minimum_ttl=data['minimum'])
-        if record_type == 'srv':
-            return SrvRecord(
-                priority=int(data['priority']), weight=int(data['weight']), port=int(data['port']),
-                target=data['target'])
-        if record_type in ['txt', 'spf']:
-            text_data = data['txt']
-            return TxtRecord(value=text_data) if isinstance(text_data, list) else TxtRecord(value=[text_data])
-        if record_type == 'alias':
-            return SubResource(id=data["resourceId"])
+        return build(_get_models(cmd, model_name, resource_type=ResourceType.MGMT_NETWORK_DNS), data)
     except KeyError as ke:
         raise CLIError("The {} record '{}' is missing a property.  {}"
                        .format(record_type, data['name'], ke))
 
 
 # pylint: disable=too-many-statements
-def import_zone(cmd, resource_group_name, zone_name, file_name):
+def import_zone(cmd, resource_group_name, zone_name, file_name, parallelism=16):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     from azure.cli.core.util import read_file_content
-    from azure.core.exceptions import HttpResponseError
-    import sys
+    if parallelism < 1:
+        raise InvalidArgumentValueError('--parallelism must be a positive integer.')
     logger.warning("In the future, zone name will be case insensitive.")
     RecordSet = cmd.get_models('RecordSet', resource_type=ResourceType.MGMT_NETWORK_DNS)
 
-    from azure.cli.core.azclierror import FileOperationError, UnclassifiedUserFault
     try:
         file_text = read_file_content(file_name)
     except FileNotFoundError:
@@ -2621,34 +2552,29 @@ def import_zone(cmd, resource_group_name, zone_name, file_name):
     zone_obj = parse_zone_file(file_text, zone_name)
 
     origin = zone_name
+    # record set key -> (lowercased name, lowercased type, RecordSet, keys of the records added so far)
     record_sets = {}
-    for record_set_name in zone_obj:
-        for record_set_type in zone_obj[record_set_name]:
-            record_set_obj = zone_obj[record_set_name][record_set_type]
-
+    for record_set_name, record_set_objs in zone_obj.items():
+        lower_record_set_name = record_set_name.lower()
+        for record_set_type, record_set_obj in record_set_objs.items():
             if record_set_type == 'soa':
                 origin = record_set_name.rstrip('.')
 
-            if not isinstance(record_set_obj, list):
-                record_set_obj = [record_set_obj]
-
-            for entry in record_set_obj:
+            # SOA and CNAME entries are stored on their own rather than in a list
+            for entry in record_set_obj if isinstance(record_set_obj, list) else (record_set_obj,):
 
                 record_set_ttl = entry['ttl']
-                record_set_key = '{}{}'.format(record_set_name.lower(), record_set_type)
                 alias_record_type = entry.get("aliasDelim", None)
-
-                if alias_record_type:
-                    alias_record_type = alias_record_type.lower()
-                    record_set_key = '{}{}'.format(record_set_name.lower(), alias_record_type)
+                record_set_key = lower_record_set_name + (alias_record_type.lower() if alias_record_type
+                                                          else record_set_type)
 
                 record = _build_record(cmd, entry)
                 if not record:
                     logger.warning('Cannot import %s. RecordType is not found. Skipping...', entry['delim'].lower())
                     continue
 
-                record_set = record_sets.get(record_set_key, None)
-                if not record_set:
+                record_set_entry = record_sets.get(record_set_key, None)
+                if not record_set_entry:
 
                     # Workaround for issue #2824
                     relative_record_set_name = record_set_name.rstrip('.')
@@ -2658,20 +2584,13 @@ def import_zone(cmd, resource_group_name, zone_name, file_name):
                             'imported at this time. Skipping...', relative_record_set_name)
                         continue
 
-                    record_set = RecordSet(ttl=record_set_ttl)
-                    record_sets[record_set_key] = record_set
-                _add_record(record_set, record, record_set_type,
-                            is_list=record_set_type.lower() not in ['soa', 'cname', 'alias'])
+                    rs_name, rs_type = record_set_key.lower().rsplit('.', 1)
+                    record_set_entry = (rs_name, rs_type, RecordSet(ttl=record_set_ttl), set())
+                    record_sets[record_set_key] = record_set_entry
+                _add_record(record_set_entry[2], record, record_set_type,
+                            is_list=record_set_type.lower() not in ['soa', 'cname', 'alias'],
+                            seen_keys=record_set_entry[3])
 
-    total_records = 0
-    for key, rs in record_sets.items():
-        rs_name, rs_type = key.lower().rsplit('.', 1)
-        rs_name = rs_name[:-(len(origin) + 1)] if rs_name != origin else '@'
-        try:
-            record_count = len(getattr(rs, _type_to_property_name(rs_type)))
-        except TypeError:
-            record_count = 1
-        total_records += record_count
     cum_records = 0
 
     client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS)
@@ -2679,17 +2598,17 @@ def import_zone(cmd, resource_group_name, zone_name, file_name):
 
     Zone = cmd.get_models('Zone', resource_type=ResourceType.MGMT_NETWORK_DNS)
     client.zones.create_or_update(resource_group_name, zone_name, Zone(location='global'))
-    for key, rs in record_sets.items():
-
-        rs_name, rs_type = key.lower().rsplit('.', 1)
-        rs_name = '@' if rs_name == origin else rs_name
-        if rs_name.endswith(origin):
-            rs_name = rs_name[:-(len(origin) + 1)]
+    # the root SOA/NS record sets depend on the server state, resolve them before dispatching any PUT
+    import_plan = []
+    origin_suffix = '.' + origin
+    for rs_name, rs_type, rs, _ in record_sets.values():
+        if rs_name == origin:
+            rs_name = '@'
+        elif rs_name.endswith(origin_suffix):
+            rs_name = rs_name[:-len(origin_suffix)]
 
-        try:
-            record_count = len(getattr(rs, _type_to_property_name(rs_type)))
-        except TypeError:
-            record_count = 1
+        records = getattr(rs, _RECORD_SET_PROPERTY_NAMES[rs_type])
+        record_count = len(records) if isinstance(records, list) else 1
         if rs_name == '@' and rs_type == 'soa':
             root_soa = client.record_sets.get(resource_group_name, zone_name, '@', 'SOA')
             rs.soa_record.host = root_soa.soa_record.host
@@ -2699,21 +2618,36 @@ def import_zone(cmd, resource_group_name, zone_name, file_name):
             root_ns.ttl = rs.ttl
             rs = root_ns
             rs_type = rs.type.rsplit('/', 1)[1]
-        try:
-            client.record_sets.create_or_update(
-                resource_group_name, zone_name, rs_name, rs_type, rs)
-            cum_records += record_count
-            print("({}/{}) Imported {} records of type '{}' and name '{}'"
-                  .format(cum_records, total_records, record_count, rs_type, rs_name), file=sys.stderr)
-        except HttpResponseError as ex:
-            logger.error(ex)
-    print("\n== {}/{} RECORDS IMPORTED SUCCESSFULLY: '{}' =="
-          .format(cum_records, total_records, zone_name), file=sys.stderr)
+        import_plan.append((rs_name, rs_type, rs, record_count))
+    total_records = sum(record_count for _, _, _, record_count in import_plan)
+
+    try:
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            tasks = {executor.submit(client.record_sets.create_or_update, resource_group_name, zone_name,
+                                     rs_name, rs_type, rs): (rs_name, rs_type, record_count)
+                     for rs_name, rs_type, rs, record_count in import_plan}
+            try:
+                for t in as_completed(tasks):
+                    rs_name, rs_type, record_count = tasks[t]
+                    try:
+                        t.result()
+                        cum_records += record_count
+                        print("({}/{}) Imported {} records of type '{}' and name '{}'"
+                              .format(cum_records, total_records, record_count, rs_type, rs_name), file=sys.stderr)
+                    except AzureError as ex:
+                        logger.error(ex)
+            finally:
+                # don't send the PUTs still queued if the import is interrupted
+                for t in tasks:
+                    t.cancel()
+    finally:
+        print("\n== {}/{} RECORDS IMPORTED SUCCESSFULLY: '{}' =="
+              .format(cum_records, total_records, zone_name), file=sys.stderr)
 
 
 def add_dns_aaaa_record(cmd, resource_group_name, zone_name, record_set_name, ipv6_address,
                         ttl=3600, if_none_match=None):
-    AaaaRecord = cmd.get_models('AaaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    AaaaRecord = _get_models(cmd, 'AaaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = AaaaRecord(ipv6_address=ipv6_address)
     record_type = 'aaaa'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2722,7 +2656,7 @@ def add_dns_aaaa_record(cmd, resource_group_name, zone_name, record_set_name, ip
 
 def add_dns_a_record(cmd, resource_group_name, zone_name, record_set_name, ipv4_address,
                      ttl=3600, if_none_match=None):
-    ARecord = cmd.get_models('ARecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    ARecord = _get_models(cmd, 'ARecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = ARecord(ipv4_address=ipv4_address)
     record_type = 'a'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name, 'arecords',
@@ -2731,7 +2665,7 @@ def add_dns_a_record(cmd, resource_group_name, zone_name, record_set_name, ipv4_
 
 def add_dns_caa_record(cmd, resource_group_name, zone_name, record_set_name, value, flags, tag,
                        ttl=3600, if_none_match=None):
-    CaaRecord = cmd.get_models('CaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    CaaRecord = _get_models(cmd, 'CaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = CaaRecord(flags=flags, tag=tag, value=value)
     record_type = 'caa'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2739,7 +2673,7 @@ def add_dns_caa_record(cmd, resource_group_name, zone_name, record_set_name, val
 
 
 def add_dns_cname_record(cmd, resource_group_name, zone_name, record_set_name, cname, ttl=3600, if_none_match=None):
-    CnameRecord = cmd.get_models('CnameRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    CnameRecord = _get_models(cmd, 'CnameRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = CnameRecord(cname=cname)
     record_type = 'cname'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2748,7 +2682,7 @@ def add_dns_cname_record(cmd, resource_group_name, zone_name, record_set_name, c
 
 def add_dns_mx_record(cmd, resource_group_name, zone_name, record_set_name, preference, exchange,
                       ttl=3600, if_none_match=None):
-    MxRecord = cmd.get_models('MxRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    MxRecord = _get_models(cmd, 'MxRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = MxRecord(preference=int(preference), exchange=exchange)
     record_type = 'mx'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2757,7 +2691,7 @@ def add_dns_mx_record(cmd, resource_group_name, zone_name, record_set_name, pref
 
 def add_dns_ns_record(cmd, resource_group_name, zone_name, record_set_name, dname,
                       subscription_id=None, ttl=3600, if_none_match=None):
-    NsRecord = cmd.get_models('NsRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    NsRecord = _get_models(cmd, 'NsRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = NsRecord(nsdname=dname)
     record_type = 'ns'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2765,7 +2699,7 @@ def add_dns_ns_record(cmd, resource_group_name, zone_name, record_set_name, dnam
 
 
 def add_dns_ptr_record(cmd, resource_group_name, zone_name, record_set_name, dname, ttl=3600, if_none_match=None):
-    PtrRecord = cmd.get_models('PtrRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    PtrRecord = _get_models(cmd, 'PtrRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = PtrRecord(ptrdname=dname)
     record_type = 'ptr'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2778,7 +2712,7 @@ def update_dns_soa_record(cmd, resource_group_name, zone_name, host=None, email=
     record_set_name = '@'
     record_type = 'soa'
 
-    ncf = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS).record_sets
+    ncf = _cached_dns_client(cmd.cli_ctx).record_sets
     record_set = ncf.get(resource_group_name, zone_name, record_set_name, record_type)
     record = record_set.soa_record
 
@@ -2791,12 +2725,12 @@ def update_dns_soa_record(cmd, resource_group_name, zone_name, host=None, email=
     record.minimum_ttl = minimum_ttl or record.minimum_ttl
 
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
-                            is_list=False, if_none_match=if_none_match)
+                            is_list=False, if_none_match=if_none_match, record_set=record_set)
 
 
 def add_dns_srv_record(cmd, resource_group_name, zone_name, record_set_name, priority, weight,
                        port, target, if_none_match=None):
-    SrvRecord = cmd.get_models('SrvRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    SrvRecord = _get_models(cmd, 'SrvRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = SrvRecord(priority=priority, weight=weight, port=port, target=target)
     record_type = 'srv'
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2804,26 +2738,19 @@ def add_dns_srv_record(cmd, resource_group_name, zone_name, record_set_name, pri
 
 
 def add_dns_txt_record(cmd, resource_group_name, zone_name, record_set_name, value, if_none_match=None):
-    TxtRecord = cmd.get_models('TxtRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    TxtRecord = _get_models(cmd, 'TxtRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = TxtRecord(value=value)
     record_type = 'txt'
+    # TXT strings are limited to 255 characters, split longer values into consecutive strings
     long_text = ''.join(x for x in record.value)
-    original_len = len(long_text)
-    record.value = []
-    while len(long_text) > 255:
-        record.value.append(long_text[:255])
-        long_text = long_text[255:]
-    record.value.append(long_text)
-    final_str = ''.join(record.value)
-    final_len = len(final_str)
-    assert original_len == final_len
+    record.value = [long_text[i:i + 255] for i in range(0, len(long_text), 255)] or ['']
     return _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
                             if_none_match=if_none_match)
 
 
 def remove_dns_aaaa_record(cmd, resource_group_name, zone_name, record_set_name, ipv6_address,
                            keep_empty_record_set=False):
-    AaaaRecord = cmd.get_models('AaaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    AaaaRecord = _get_models(cmd, 'AaaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = AaaaRecord(ipv6_address=ipv6_address)
     record_type = 'aaaa'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2832,7 +2759,7 @@ def remove_dns_aaaa_record(cmd, resource_group_name, zone_name, record_set_name,
 
 def remove_dns_a_record(cmd, resource_group_name, zone_name, record_set_name, ipv4_address,
                         keep_empty_record_set=False):
-    ARecord = cmd.get_models('ARecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    ARecord = _get_models(cmd, 'ARecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = ARecord(ipv4_address=ipv4_address)
     record_type = 'a'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2841,7 +2768,7 @@ def remove_dns_a_record(cmd, resource_group_name, zone_name, record_set_name, ip
 
 def remove_dns_caa_record(cmd, resource_group_name, zone_name, record_set_name, value,
                           flags, tag, keep_empty_record_set=False):
-    CaaRecord = cmd.get_models('CaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    CaaRecord = _get_models(cmd, 'CaaRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = CaaRecord(flags=flags, tag=tag, value=value)
     record_type = 'caa'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2850,7 +2777,7 @@ def remove_dns_caa_record(cmd, resource_group_name, zone_name, record_set_name,
 
 def remove_dns_cname_record(cmd, resource_group_name, zone_name, record_set_name, cname,
                             keep_empty_record_set=False):
-    CnameRecord = cmd.get_models('CnameRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    CnameRecord = _get_models(cmd, 'CnameRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = CnameRecord(cname=cname)
     record_type = 'cname'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2859,7 +2786,7 @@ def remove_dns_cname_record(cmd, resource_group_name, zone_name, record_set_name
 
 def remove_dns_mx_record(cmd, resource_group_name, zone_name, record_set_name, preference, exchange,
                          keep_empty_record_set=False):
-    MxRecord = cmd.get_models('MxRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    MxRecord = _get_models(cmd, 'MxRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = MxRecord(preference=int(preference), exchange=exchange)
     record_type = 'mx'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2868,7 +2795,7 @@ def remove_dns_mx_record(cmd, resource_group_name, zone_name, record_set_name, p
 
 def remove_dns_ns_record(cmd, resource_group_name, zone_name, record_set_name, dname,
                          keep_empty_record_set=False):
-    NsRecord = cmd.get_models('NsRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    NsRecord = _get_models(cmd, 'NsRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = NsRecord(nsdname=dname)
     record_type = 'ns'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2877,7 +2804,7 @@ def remove_dns_ns_record(cmd, resource_group_name, zone_name, record_set_name, d
 
 def remove_dns_ptr_record(cmd, resource_group_name, zone_name, record_set_name, dname,
                           keep_empty_record_set=False):
-    PtrRecord = cmd.get_models('PtrRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    PtrRecord = _get_models(cmd, 'PtrRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = PtrRecord(ptrdname=dname)
     record_type = 'ptr'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2886,7 +2813,7 @@ def remove_dns_ptr_record(cmd, resource_group_name, zone_name, record_set_name,
 
 def remove_dns_srv_record(cmd, resource_group_name, zone_name, record_set_name, priority, weight,
                           port, target, keep_empty_record_set=False):
-    SrvRecord = cmd.get_models('SrvRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    SrvRecord = _get_models(cmd, 'SrvRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = SrvRecord(priority=priority, weight=weight, port=port, target=target)
     record_type = 'srv'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2895,7 +2822,7 @@ def remove_dns_srv_record(cmd, resource_group_name, zone_name, record_set_name,
 
 def remove_dns_txt_record(cmd, resource_group_name, zone_name, record_set_name, value,
                           keep_empty_record_set=False):
-    TxtRecord = cmd.get_models('TxtRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
+    TxtRecord = _get_models(cmd, 'TxtRecord', resource_type=ResourceType.MGMT_NETWORK_DNS)
     record = TxtRecord(value=value)
     record_type = 'txt'
     return _remove_record(cmd.cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
@@ -2971,11 +2898,40 @@ def _check_txt_record_exist(record, exist_list):
     return False
 
 
-def _record_exist_func(record_type):
-    return globals()["_check_{}_record_exist".format(record_type)]
+_RECORD_EXIST_FUNCS = {
+    'a': _check_a_record_exist,
+    'aaaa': _check_aaaa_record_exist,
+    'caa': _check_caa_record_exist,
+    'cname': _check_cname_record_exist,
+    'mx': _check_mx_record_exist,
+    'ns': _check_ns_record_exist,
+    'ptr': _check_ptr_record_exist,
+    'srv': _check_srv_record_exist,
+    'txt': _check_txt_record_exist,
+}
 
 
-def _add_record(record_set, record, record_type, is_list=False):
+def _record_exist_func(record_type):
+    return _RECORD_EXIST_FUNCS[record_type]
+
+
+# hashable identity of a record, matching the fields compared by the _check_*_record_exist helpers
+_RECORD_KEYS = {
+    'a': lambda r: (r.ipv4_address,),
+    'aaaa': lambda r: (r.ipv6_address,),
+    'caa': lambda r: (r.flags, r.tag, r.value),
+    'cname': lambda r: (r.cname,),
+    'mx': lambda r: (r.preference, r.exchange),
+    'ns': lambda r: (r.nsdname,),
+    'ptr': lambda r: (r.ptrdname,),
+    'srv': lambda r: (r.priority, r.weight, r.port, r.target),
+    'txt': lambda r: tuple(r.value) if isinstance(r.value, list) else (r.value,),
+}
+
+
+def _add_record(record_set, record, record_type, is_list=False, seen_keys=None):
+    """ Add a record to the record set, skipping duplicates. Callers adding many records to the same record set
+    can pass `seen_keys`, a set tracking the records added so far, to avoid rescanning the record list each time. """
     record_property = _type_to_property_name(record_type)
 
     if is_list:
@@ -2984,24 +2940,34 @@ def _add_record(record_set, record, record_type, is_list=False):
             setattr(record_set, record_property, [])
             record_list = getattr(record_set, record_property)
 
-        _record_exist = _record_exist_func(record_type)
-        if not _record_exist(record, record_list):
-            record_list.append(record)
+        if seen_keys is None:
+            _record_exist = _record_exist_func(record_type)
+            if not _record_exist(record, record_list):
+                record_list.append(record)
+        else:
+            record_key = _RECORD_KEYS[record_type](record)
+            if record_key not in seen_keys:
+                seen_keys.add(record_key)
+                record_list.append(record)
     else:
         setattr(record_set, record_property, record)
 
 
 def _add_save_record(cmd, record, record_type, record_set_name, resource_group_name, zone_name,
-                     is_list=True, subscription_id=None, ttl=None, if_none_match=None):
-    from azure.core.exceptions import HttpResponseError
-    ncf = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS,
-                                  subscription_id=subscription_id).record_sets
-
-    try:
-        record_set = ncf.get(resource_group_name, zone_name, record_set_name, record_type)
-    except HttpResponseError:
-        RecordSet = cmd.get_models('RecordSet', resource_type=ResourceType.MGMT_NETWORK_DNS)
-        record_set = RecordSet(ttl=3600)
+                     is_list=True, subscription_id=None, ttl=None, if_none_match=None, record_set=None):
+    ncf = _cached_dns_client(cmd.cli_ctx, subscription_id).record_sets
+
+    # callers that already hold the current record set pass it in to save a GET
+    if record_set is None:
+        RecordSet = _get_models(cmd, 'RecordSet', resource_type=ResourceType.MGMT_NETWORK_DNS)
+        if if_none_match:
+            # the PUT below fails when the record set exists, so the current one is never needed
+            record_set = RecordSet(ttl=3600)
+        else:
+            try:
+                record_set = ncf.get(resource_group_name, zone_name, record_set_name, record_type)
+            except HttpResponseError:
+                record_set = RecordSet(ttl=3600)
 
     if ttl is not None:
         record_set.ttl = ttl
@@ -3015,15 +2981,17 @@ def _add_save_record(cmd, record, record_type, record_set_name, resource_group_n
 
 def _remove_record(cli_ctx, record, record_type, record_set_name, resource_group_name, zone_name,
                    keep_empty_record_set, is_list=True):
-    ncf = get_mgmt_service_client(cli_ctx, ResourceType.MGMT_NETWORK_DNS).record_sets
+    ncf = _cached_dns_client(cli_ctx).record_sets
     record_set = ncf.get(resource_group_name, zone_name, record_set_name, record_type)
     record_property = _type_to_property_name(record_type)
 
     if is_list:
         record_list = getattr(record_set, record_property)
         if record_list is not None:
+            # fields left empty on the record match anything, so leave them out of the per-candidate checks
+            filter_dict = {key: value for key, value in record.__dict__.items() if value}
             keep_list = [r for r in record_list
-                         if not dict_matches_filter(r.__dict__, record.__dict__)]
+                         if not dict_matches_filter(r.__dict__, filter_dict)]
             if len(keep_list) == len(record_list):
                 raise CLIError('Record {} not found.'.format(str(record)))
             setattr(record_set, record_property, keep_list)
@@ -3044,10 +3012,18 @@ def _remove_record(cli_ctx, record, record_type, record_set_name, resource_group
 
 def dict_matches_filter(d, filter_dict):
     sentinel = object()
-    return all(not filter_dict.get(key, None) or
-               str(filter_dict[key]) == str(d.get(key, sentinel)) or
-               lists_match(filter_dict[key], d.get(key, []))
-               for key in filter_dict)
+    for key, filter_value in filter_dict.items():
+        if not filter_value:
+            continue
+        value = d.get(key, sentinel)
+        if value is sentinel:
+            return False
+        if isinstance(filter_value, list) and isinstance(value, list):
+            if not lists_match(filter_value, value):
+                return False
+        elif str(filter_value) != str(value):
+            return False
+    return True
 
 
 def lists_match(l1, l2):
@@ -3125,20 +3101,17 @@ class ExpressRouteUpdate(_ExpressRouteUpdate):
 def _validate_ipv6_address_prefixes(prefixes):
     from ipaddress import ip_network, IPv6Network
     prefixes = prefixes if isinstance(prefixes, list) else [prefixes]
-    version = None
+    network_types = set()
     for prefix in prefixes:
         try:
-            network = ip_network(prefix)
-            if version is None:
-                version = type(network)
-            else:
-                if not isinstance(network, version):  # pylint: disable=isinstance-second-argument-not-valid-type
-                    raise CLIError("usage error: '{}' incompatible mix of IPv4 and IPv6 address prefixes."
-                                   .format(prefixes))
+            network_types.add(type(ip_network(prefix)))
         except ValueError:
             raise CLIError("usage error: prefix '{}' is not recognized as an IPv4 or IPv6 address prefix."
                            .format(prefix))
-    return version == IPv6Network
+    if len(network_types) > 1:
+        raise CLIError("usage error: '{}' incompatible mix of IPv4 and IPv6 address prefixes."
+                       .format(prefixes))
+    return IPv6Network in network_types
 
 
 class ExpressRoutePeeringCreate(_ExpressRoutePeeringCreate):
@@ -3398,7 +3371,6 @@ def download_generated_loa_as_pdf(cmd,
 
     encoded_content = base64.b64decode(response['encodedContent'])
 
-    from azure.cli.core.azclierror import FileOperationError
     try:
         with open(file_path, 'wb') as f:
             f.write(encoded_content)
@@ -7671,7 +7643,6 @@ def create_virtual_hub(cmd,
                        public_ip_address,
                        location=None,
                        tags=None):
-    from azure.core.exceptions import HttpResponseError
     from azure.cli.core.commands import LongRunningOperation
     from .aaz.latest.network.routeserver import Show
     from .aaz.latest.network.routeserver import List
@@ -7742,7 +7713,6 @@ def create_virtual_router(cmd,
     vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
     vhub_client = network_client_factory(cmd.cli_ctx).virtual_hubs
 
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client.get(resource_group_name, virtual_router_name)
     except HttpResponseError:
@@ -7797,7 +7767,6 @@ def create_virtual_router(cmd,
 
 
 def virtual_router_update_getter(cmd, resource_group_name, virtual_router_name):
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
         return vrouter_client.get(resource_group_name, virtual_router_name)
@@ -7846,7 +7815,6 @@ def show_virtual_router(cmd, resource_group_name, virtual_router_name):
     vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
     vhub_client = network_client_factory(cmd.cli_ctx).virtual_hubs
 
-    from azure.core.exceptions import HttpResponseError
     try:
         item = vrouter_client.get(resource_group_name, virtual_router_name)
     except HttpResponseError:
@@ -7861,7 +7829,6 @@ def delete_virtual_router(cmd, resource_group_name, virtual_router_name):
     vhub_client = network_client_factory(cmd.cli_ctx).virtual_hubs
     vhub_ip_config_client = network_client_factory(cmd.cli_ctx).virtual_hub_ip_configuration
 
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client.get(resource_group_name, virtual_router_name)
         item = vrouter_client.begin_delete(resource_group_name, virtual_router_name)
@@ -7880,7 +7847,6 @@ def delete_virtual_router(cmd, resource_group_name, virtual_router_name):
 def create_virtual_router_peering(cmd, resource_group_name, virtual_router_name, peering_name, peer_asn, peer_ip):
 
     # try VirtualRouter first
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
         vrouter_client.get(resource_group_name, virtual_router_name)
@@ -7918,7 +7884,6 @@ def create_virtual_router_peering(cmd, resource_group_name, virtual_router_name,
 def virtual_router_peering_update_getter(cmd, resource_group_name, virtual_router_name, peering_name):
     vrouter_peering_client = network_client_factory(cmd.cli_ctx).virtual_router_peerings
 
-    from azure.core.exceptions import HttpResponseError
     try:
         return vrouter_peering_client.get(resource_group_name, virtual_router_name, peering_name)
     except HttpResponseError:  # 404
@@ -7955,7 +7920,6 @@ def update_virtual_router_peering(cmd, instance, peer_asn=None, peer_ip=None):
 def list_virtual_router_peering(cmd, resource_group_name, virtual_router_name):
     virtual_hub_name = virtual_router_name
 
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
         vrouter_client.get(resource_group_name, virtual_router_name)
@@ -7985,7 +7949,6 @@ def list_virtual_router_peering(cmd, resource_group_name, virtual_router_name):
 
 
 def show_virtual_router_peering(cmd, resource_group_name, virtual_router_name, peering_name):
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
         vrouter_client.get(resource_group_name, virtual_router_name)
@@ -8012,7 +7975,6 @@ def show_virtual_router_peering(cmd, resource_group_name, virtual_router_name, p
 
 
 def delete_virtual_router_peering(cmd, resource_group_name, virtual_router_name, peering_name):
-    from azure.core.exceptions import HttpResponseError
     try:
         vrouter_client = network_client_factory(cmd.cli_ctx).virtual_routers
         vrouter_client.get(resource_group_name, virtual_router_name)
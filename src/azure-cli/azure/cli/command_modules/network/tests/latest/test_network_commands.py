@@ -2464,7 +2464,7 @@ class NetworkAppGatewayWafPolicyScenarioTest(ScenarioTest):
 
         # case 5: clear manage rule set by group {csr_grp1} and only {csr_grp2} left
         self.cmd('network application-gateway waf-policy managed-rule rule-set remove -g {rg} --policy-name {waf} '
-                 '--type OWASP --version 3.1 '
+                 '--type OWASP --version 3.0 '
                  '--group-name {csr_grp1} ')
         self.cmd('network application-gateway waf-policy managed-rule rule-set list -g {rg} --policy-name {waf}', checks=[
             self.check('managedRuleSets[0].ruleGroupOverrides | length(@)', 1),
@@ -10,6 +10,19 @@ from unittest import mock
 from knack.util import CLIError
 
 
+class SdkLikeModel:
+    # like the SDK models: compared by value and therefore unhashable
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, SdkLikeModel) and vars(self) == vars(other)
+
+
+def mock_get_sdk_like_models(_, *names, **kwargs):
+    return SdkLikeModel if len(names) == 1 else tuple(SdkLikeModel for _ in names)
+
+
 class TestNetworkUnitTests(unittest.TestCase):
     def test_network_get_nic_ip_config(self):
         from azure.cli.command_modules.network.custom import _get_nic_ip_config
@@ -76,6 +89,400 @@ class TestNetworkUnitTests(unittest.TestCase):
         self.assertEqual(len(result), 2)
         self.assertEqual(result[1].value, 'noodle')
 
+    def test_network_get_models_memoized(self):
+        from azure.cli.command_modules.network.custom import _get_models, _cached_get_models
+
+        _cached_get_models.cache_clear()
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.cloud.profile = 'latest'
+        cmd.command_kwargs = {'resource_type': 'network'}
+        with mock.patch('azure.cli.core.profiles._shared.get_versioned_sdk', return_value='model') as get_sdk:
+            self.assertEqual(_get_models(cmd, 'SubResource'), 'model')
+            self.assertEqual(_get_models(cmd, 'SubResource'), 'model')
+            get_sdk.assert_called_once_with('latest', 'network', 'SubResource', mod='models', operation_group=None)
+
+            # a different profile must resolve its own models
+            cmd.cli_ctx.cloud.profile = '2019-03-01-hybrid'
+            _get_models(cmd, 'SubResource')
+            self.assertEqual(get_sdk.call_count, 2)
+        _cached_get_models.cache_clear()
+
+    def test_network_cached_dns_client(self):
+        from azure.cli.command_modules.network.custom import _cached_dns_client
+
+        cli_ctx = mock.MagicMock()
+        cli_ctx.data = {'subscription_id': 'sub1'}
+        with mock.patch('azure.cli.command_modules.network.custom.get_mgmt_service_client',
+                        side_effect=lambda *args, **kwargs: mock.MagicMock()) as get_client:
+            client = _cached_dns_client(cli_ctx)
+            self.assertIs(_cached_dns_client(cli_ctx), client)
+            self.assertEqual(get_client.call_count, 1)
+
+            # --subscription changes the client even without an explicit subscription id
+            cli_ctx.data['subscription_id'] = 'sub2'
+            self.assertIsNot(_cached_dns_client(cli_ctx), client)
+            self.assertEqual(get_client.call_count, 2)
+
+            # an explicit subscription id shares the client built for the same subscription
+            self.assertIs(_cached_dns_client(cli_ctx, 'sub1'), client)
+            self.assertEqual(get_client.call_count, 2)
+
+    def test_network_upsert_in_place(self):
+        from azure.cli.command_modules.network.custom import _upsert_in_place
+
+        Model = SdkLikeModel
+        # 1 - verify upsert to a null collection
+        parent = Model(collection=None)
+        _upsert_in_place(parent, 'collection', Model(name='object1', value='cat'))
+        self.assertEqual([x.value for x in parent.collection], ['cat'])
+
+        # 2 - verify can add more than one
+        _upsert_in_place(parent, 'collection', Model(name='object2', value='dog'))
+        self.assertEqual([x.value for x in parent.collection], ['cat', 'dog'])
+
+        # 3 - verify an existing item is replaced in place
+        _upsert_in_place(parent, 'collection', Model(name='object1', value='noodle'))
+        self.assertEqual([x.value for x in parent.collection], ['noodle', 'dog'])
+
+        # 4 - verify items reordered outside of the helper are still matched by name
+        parent.collection.reverse()
+        _upsert_in_place(parent, 'collection', Model(name='object1', value='fish'))
+        self.assertEqual([x.value for x in parent.collection], ['dog', 'fish'])
+
+        # 5 - verify a missing key is rejected
+        with self.assertRaises(CLIError):
+            _upsert_in_place(parent, 'collection', Model(name=None, value='cow'))
+
+    def test_network_ag_children_with_sdk_like_models(self):
+        from azure.cli.command_modules.network.custom import create_ag_redirect_configuration, \
+            create_ag_rewrite_rule_set
+
+        ag = SdkLikeModel(redirect_configurations=None, rewrite_rule_sets=[SdkLikeModel(name='set1')])
+        client = mock.MagicMock()
+        client.application_gateways.get.return_value = ag
+        cmd = mock.MagicMock()
+        with mock.patch('azure.cli.command_modules.network.custom._cached_network_client', return_value=client), \
+                mock.patch('azure.cli.command_modules.network.custom._get_models',
+                           side_effect=mock_get_sdk_like_models):
+            create_ag_redirect_configuration(cmd, 'rg', 'ag', 'redirect1', 'Permanent', target_url='https://a')
+            create_ag_rewrite_rule_set(cmd, 'rg', 'ag', 'set2', no_wait=True)
+            create_ag_rewrite_rule_set(cmd, 'rg', 'ag', 'set1', no_wait=True)
+
+        self.assertEqual([x.target_url for x in ag.redirect_configurations], ['https://a'])
+        self.assertEqual([x.name for x in ag.rewrite_rule_sets], ['set1', 'set2'])
+
+    def test_network_ag_probe_and_root_cert_with_sdk_like_models(self):
+        from azure.cli.command_modules.network.custom import create_ag_probe, create_ag_trusted_root_certificate
+
+        ag = SdkLikeModel(probes=[SdkLikeModel(name='probe1', path='/old')], trusted_root_certificates=None)
+        client = mock.MagicMock()
+        client.application_gateways.get.return_value = ag
+        cmd = mock.MagicMock()
+        with mock.patch('azure.cli.command_modules.network.custom._cached_network_client', return_value=client), \
+                mock.patch('azure.cli.command_modules.network.custom._supported_api_version', return_value=False), \
+                mock.patch('azure.cli.command_modules.network.custom._get_models',
+                           side_effect=mock_get_sdk_like_models):
+            create_ag_probe(cmd, 'rg', 'ag', 'probe1', 'Http', 'contoso.com', '/new')
+            create_ag_trusted_root_certificate(cmd, 'rg', 'ag', 'cert1', cert_data='data')
+
+        self.assertEqual([x.path for x in ag.probes], ['/new'])
+        self.assertEqual([x.name for x in ag.trusted_root_certificates], ['cert1'])
+        self.assertEqual(client.application_gateways.begin_create_or_update.call_count, 2)
+
+    def test_network_staged_application_gateway(self):
+        from azure.cli.command_modules.network.custom import StagedApplicationGateway, create_ag_backend_address_pool
+
+        def mock_pool(name=None, backend_addresses=None):
+            fake = mock.MagicMock()
+            fake.name = name
+            return fake
+
+        cmd = mock.MagicMock()
+        ag = mock.MagicMock()
+        ag.backend_address_pools = []
+        client = mock.MagicMock()
+        client.application_gateways.get.return_value = ag
+        with mock.patch('azure.cli.command_modules.network.custom._cached_network_client', return_value=client), \
+                mock.patch('azure.cli.command_modules.network.custom._get_models', return_value=mock_pool):
+            with StagedApplicationGateway(cmd, 'rg', 'ag') as staged:
+                create_ag_backend_address_pool(cmd, 'rg', 'ag', 'pool1')
+                create_ag_backend_address_pool(cmd, 'RG', 'AG', 'pool2')
+                client.application_gateways.begin_create_or_update.assert_not_called()
+
+            # one GET on enter and one PUT on exit for all staged children
+            client.application_gateways.get.assert_called_once_with('rg', 'ag')
+            client.application_gateways.begin_create_or_update.assert_called_once_with('rg', 'ag', ag)
+            self.assertIs(staged.poller, client.application_gateways.begin_create_or_update.return_value)
+            self.assertEqual([x.name for x in ag.backend_address_pools], ['pool1', 'pool2'])
+
+            # outside of the block the helper sends its own GET and PUT again
+            create_ag_backend_address_pool(cmd, 'rg', 'ag', 'pool3')
+            self.assertEqual(client.application_gateways.get.call_count, 2)
+            self.assertEqual(client.application_gateways.begin_create_or_update.call_count, 2)
+
+            # a nested stage joins the enclosing one instead of sending its own requests
+            with StagedApplicationGateway(cmd, 'rg', 'ag') as outer:
+                with StagedApplicationGateway(cmd, 'rg', 'ag') as inner:
+                    self.assertIs(inner.instance, outer.instance)
+                self.assertIsNone(inner.poller)
+            self.assertEqual(client.application_gateways.get.call_count, 3)
+            self.assertEqual(client.application_gateways.begin_create_or_update.call_count, 3)
+
+    def test_network_staged_rewrite_rule_conditions(self):
+        from azure.cli.command_modules.network.custom import StagedApplicationGateway, \
+            create_ag_rewrite_rule_condition, delete_ag_rewrite_rule_condition
+
+        def mock_condition(variable=None, **kwargs):
+            fake = mock.MagicMock()
+            fake.variable = variable
+            return fake
+
+        rule = mock.MagicMock()
+        rule.name = 'rule1'
+        rule.conditions = []
+        rule_set = mock.MagicMock()
+        rule_set.name = 'set1'
+        rule_set.rewrite_rules = [rule]
+        ag = mock.MagicMock()
+        ag.rewrite_rule_sets = [rule_set]
+        client = mock.MagicMock()
+        client.application_gateways.get.return_value = ag
+        cmd = mock.MagicMock()
+        with mock.patch('azure.cli.command_modules.network.custom._cached_network_client', return_value=client), \
+                mock.patch('azure.cli.command_modules.network.custom._get_models', return_value=mock_condition):
+            with StagedApplicationGateway(cmd, 'rg', 'ag'):
+                for variable in ['http_req_Host', 'http_req_Accept', 'http_req_Cookie']:
+                    condition = create_ag_rewrite_rule_condition(cmd, 'rg', 'ag', 'set1', 'rule1', variable)
+                    self.assertEqual(condition.variable, variable)
+                delete_ag_rewrite_rule_condition(cmd, 'rg', 'ag', 'set1', 'rule1', 'http_req_Accept')
+
+        client.application_gateways.get.assert_called_once_with('rg', 'ag')
+        client.application_gateways.begin_create_or_update.assert_called_once_with('rg', 'ag', ag)
+        self.assertEqual([x.variable for x in rule.conditions], ['http_req_Host', 'http_req_Cookie'])
+
+    def test_network_update_rewrite_rule_url_configuration(self):
+        from types import SimpleNamespace
+        from azure.cli.command_modules.network.custom import update_ag_rewrite_rule
+
+        class UpdateContext:
+            def __init__(self, instance):
+                self.instance = instance
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc_val, exc_tb):
+                pass
+
+            def set_param(self, prop, value):
+                curr_obj = self.instance
+                while '.' in prop:
+                    name, prop = prop.split('.', 1)
+                    curr_obj = getattr(curr_obj, name)
+                setattr(curr_obj, prop, None if value == '' else value)
+
+        cmd = mock.MagicMock()
+        cmd.update_context.side_effect = UpdateContext
+        url_configuration = SimpleNamespace(modified_path='/new', modified_query_string='a=b', reroute=True)
+        rule = SimpleNamespace(rule_sequence=100, action_set=SimpleNamespace(
+            request_header_configurations=None, response_header_configurations=None,
+            url_configuration=url_configuration))
+        parent = mock.MagicMock()
+
+        # 1 - only the given field changes, the path and query string are preserved
+        self.assertIs(update_ag_rewrite_rule(rule, parent, cmd, 'set1', 'rule1', enable_reroute=False), parent)
+        self.assertIs(rule.action_set.url_configuration, url_configuration)
+        self.assertEqual(vars(url_configuration), {'modified_path': '/new', 'modified_query_string': 'a=b',
+                                                   'reroute': False})
+
+        # 2 - an empty value clears just that field
+        update_ag_rewrite_rule(rule, parent, cmd, 'set1', 'rule1', modified_path='')
+        self.assertEqual(vars(url_configuration), {'modified_path': None, 'modified_query_string': 'a=b',
+                                                   'reroute': False})
+
+        # 3 - a missing url configuration is created on demand
+        rule.action_set.url_configuration = None
+        with mock.patch('azure.cli.command_modules.network.custom._get_models',
+                        return_value=lambda: SimpleNamespace(modified_path=None, modified_query_string=None,
+                                                             reroute=None)):
+            update_ag_rewrite_rule(rule, parent, cmd, 'set1', 'rule1', modified_path='/other')
+        self.assertEqual(vars(rule.action_set.url_configuration), {'modified_path': '/other',
+                                                                   'modified_query_string': None, 'reroute': None})
+        self.assertEqual(rule.rule_sequence, 100)
+
+    def test_network_waf_rule_sets_cached(self):
+        import tempfile
+        from azure.cli.command_modules.network.custom import _list_ag_waf_rule_sets_cached
+
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.cloud.name = 'AzureCloud'
+        rule_sets = [{'ruleSetType': 'OWASP', 'ruleSetVersion': '3.2', 'ruleGroups': []}]
+        with tempfile.TemporaryDirectory() as config_dir, \
+                mock.patch('azure.cli.core._environment.get_config_dir', return_value=config_dir), \
+                mock.patch('azure.cli.command_modules.network.custom.list_ag_waf_rule_sets',
+                           return_value=rule_sets) as list_rule_sets:
+            self.assertEqual(_list_ag_waf_rule_sets_cached(cmd, 'OWASP', '3.2'), rule_sets)
+            self.assertEqual(_list_ag_waf_rule_sets_cached(cmd, 'OWASP', '3.2'), rule_sets)
+            list_rule_sets.assert_called_once_with(cmd, _type='OWASP', version='3.2', group='*')
+
+            # another version is cached separately
+            _list_ag_waf_rule_sets_cached(cmd, 'OWASP', '3.1')
+            self.assertEqual(list_rule_sets.call_count, 2)
+
+    def test_network_waf_config_refreshes_cached_rule_sets(self):
+        import tempfile
+        from types import SimpleNamespace
+        from azure.cli.command_modules.network.custom import set_ag_waf_config, _list_ag_waf_rule_sets_cached
+
+        class FakeUpdate:
+            def __init__(self, cli_ctx):
+                self.ctx = SimpleNamespace(args=SimpleNamespace())
+
+            def __call__(self, command_args):
+                self.pre_operations()
+                instance = SimpleNamespace(properties=SimpleNamespace())
+                self.pre_instance_update(instance)
+                return instance.properties.web_application_firewall_configuration
+
+        def rule_set(*rule_ids):
+            return [{'ruleSetType': 'OWASP', 'ruleSetVersion': '3.2', 'ruleGroups': [
+                {'ruleGroupName': 'REQUEST-920', 'rules': [{'ruleId': rule_id} for rule_id in rule_ids]}]}]
+
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.cloud.name = 'AzureCloud'
+        with tempfile.TemporaryDirectory() as config_dir, \
+                mock.patch('azure.cli.core._environment.get_config_dir', return_value=config_dir), \
+                mock.patch('azure.cli.command_modules.network.custom._ApplicationGatewayUpdate', FakeUpdate), \
+                mock.patch('azure.cli.command_modules.network.custom.list_ag_waf_rule_sets') as list_rule_sets:
+            # the cached copy only knows one of the requested rules
+            list_rule_sets.return_value = rule_set(920100)
+            _list_ag_waf_rule_sets_cached(cmd, 'OWASP', '3.2')
+            list_rule_sets.return_value = rule_set(920100, 920120)
+
+            waf_config = set_ag_waf_config(cmd, 'rg', 'ag', 'true', rule_set_version='3.2',
+                                           disabled_rules=['920100', '920120'])
+            self.assertEqual(waf_config['disabled_rule_groups'],
+                             [{'rule_group_name': 'REQUEST-920', 'rules': [920100, 920120]}])
+            self.assertEqual(list_rule_sets.call_count, 2)
+
+            # the refreshed copy is written back, so the next lookup is served from it
+            self.assertEqual(_list_ag_waf_rule_sets_cached(cmd, 'OWASP', '3.2'), rule_set(920100, 920120))
+            set_ag_waf_config(cmd, 'rg', 'ag', 'true', rule_set_version='3.2', disabled_rules=['920120'])
+            self.assertEqual(list_rule_sets.call_count, 2)
+
+    def test_network_add_waf_managed_rule_set_replaces_overrides(self):
+        from types import SimpleNamespace
+        from azure.cli.command_modules.network.custom import add_waf_managed_rule_set
+
+        def existing_rule(rule_id, state):
+            return SimpleNamespace(rule_id=mock.Mock(to_serialized_data=mock.Mock(return_value=rule_id)), state=state)
+
+        rule_override = SimpleNamespace(rule_group_name='REQUEST-942', rules=[existing_rule('942100', 'Enabled'),
+                                                                            existing_rule('942110', 'Enabled')])
+        instance = SimpleNamespace(properties=SimpleNamespace(managed_rules=SimpleNamespace(managed_rule_sets=[
+            SimpleNamespace(rule_set_type='OWASP', rule_set_version='3.2', rule_group_overrides=[rule_override])])))
+
+        def fake_update(cli_ctx, callbacks):
+            return lambda command_args: callbacks['pre_instance_update'](instance, ctx=None)
+
+        new_rule = {'rule_id': '942100', 'state': 'Disabled', 'action': 'Log'}
+        other_rule = {'rule_id': '942120', 'state': 'Disabled'}
+        with mock.patch('azure.cli.command_modules.network.custom._WAFPolicyUpdate', side_effect=fake_update):
+            with self.assertLogs('cli.azure.cli.command_modules.network.custom', level='WARNING'):
+                add_waf_managed_rule_set(mock.MagicMock(), 'rg', 'policy', 'OWASP', '3.2',
+                                         rule_group_name='REQUEST-942', rules=[new_rule, other_rule])
+
+        # the existing override of the same rule is replaced at its position, new rules are appended
+        self.assertIs(rule_override.rules[0], new_rule)
+        self.assertEqual(rule_override.rules[1].state, 'Enabled')
+        self.assertIs(rule_override.rules[2], other_rule)
+        self.assertEqual(len(rule_override.rules), 3)
+
+    def test_network_add_record_seen_keys(self):
+        from types import SimpleNamespace
+        from azure.cli.command_modules.network.custom import _add_record
+
+        record_set = SimpleNamespace(txt_records=None)
+        seen_keys = set()
+        for value in [['a', 'b'], ['c'], ['a', 'b']]:
+            _add_record(record_set, SimpleNamespace(value=value), 'txt', is_list=True, seen_keys=seen_keys)
+        self.assertEqual([r.value for r in record_set.txt_records], [['a', 'b'], ['c']])
+
+        # without the tracking set the record list is scanned instead, with the same result
+        _add_record(record_set, SimpleNamespace(value=['c']), 'txt', is_list=True)
+        self.assertEqual(len(record_set.txt_records), 2)
+
+    def test_network_import_zone(self):
+        import io
+        from azure.core.exceptions import ServiceRequestError
+        from azure.cli.core.azclierror import InvalidArgumentValueError
+        from azure.cli.command_modules.network.custom import import_zone
+
+        class Model:
+            def __init__(self, **kwargs):
+                self.__dict__.update(kwargs)
+
+            def __getattr__(self, name):
+                if name.startswith('_'):
+                    raise AttributeError(name)
+                return None
+
+        def create_or_update(resource_group_name, zone_name, rs_name, rs_type, rs):
+            if rs_name == 'mail':
+                raise ServiceRequestError('connection reset')
+            return rs
+
+        zone_file = '\n'.join([
+            '$ORIGIN example.com.',
+            '$TTL 3600',
+            '@ IN SOA ns1.example.com. hostmaster.example.com. 1 3600 300 2419200 300',
+            '@ IN NS ns1.example.com.',
+            'www IN A 10.0.0.1',
+            'www IN A 10.0.0.2',
+            'mail IN A 10.0.0.3',
+        ])
+        cmd = mock.MagicMock()
+        cmd.get_models.return_value = Model
+        client = mock.MagicMock()
+        client.record_sets.get.side_effect = lambda rg, zone, name, rs_type: {
+            'SOA': Model(soa_record=Model(host='ns1-01.azure-dns.com.')),
+            'NS': Model(type='Microsoft.Network/dnszones/NS', ttl=172800, ns_records=[Model(nsdname='ns1-01')]),
+        }[rs_type]
+        client.record_sets.create_or_update.side_effect = create_or_update
+        with mock.patch('azure.cli.command_modules.network.custom.get_mgmt_service_client', return_value=client), \
+                mock.patch('azure.cli.command_modules.network.custom._get_models', return_value=Model), \
+                mock.patch('azure.cli.core.util.read_file_content', return_value=zone_file), \
+                mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            # 1 - the parallelism must be positive
+            with self.assertRaises(InvalidArgumentValueError):
+                import_zone(cmd, 'rg', 'example.com', 'zone.txt', parallelism=0)
+            client.zones.create_or_update.assert_not_called()
+
+            # 2 - a failing record set is logged without stopping the others
+            with self.assertLogs('cli.azure.cli.command_modules.network.custom', level='ERROR'):
+                import_zone(cmd, 'rg', 'example.com', 'zone.txt', parallelism=2)
+
+        # the root SOA and NS record sets are read once, before any record set is written
+        self.assertEqual(client.record_sets.get.call_args_list,
+                         [mock.call('rg', 'example.com', '@', 'SOA'), mock.call('rg', 'example.com', '@', 'NS')])
+        written = sorted((c[0][2], c[0][3]) for c in client.record_sets.create_or_update.call_args_list)
+        self.assertEqual(written, [('@', 'NS'), ('@', 'soa'), ('mail', 'a'), ('www', 'a')])
+        self.assertIn('4/5 RECORDS IMPORTED SUCCESSFULLY', stderr.getvalue())
+
+    def test_network_dict_matches_filter(self):
+        from azure.cli.command_modules.network.custom import dict_matches_filter
+
+        record = {'ipv4_address': '10.0.0.1', 'additional_properties': {}}
+        self.assertTrue(dict_matches_filter(record, {'ipv4_address': '10.0.0.1', 'additional_properties': {}}))
+        # empty filter values match anything
+        self.assertTrue(dict_matches_filter(record, {'ipv4_address': None}))
+        # scalar values are not compared as character multisets
+        self.assertFalse(dict_matches_filter(record, {'ipv4_address': '10.0.1.0'}))
+        self.assertFalse(dict_matches_filter(record, {'ipv6_address': '::1'}))
+        # list values match regardless of order
+        self.assertTrue(dict_matches_filter({'value': ['a', 'b']}, {'value': ['b', 'a']}))
+        self.assertFalse(dict_matches_filter({'value': ['a', 'b']}, {'value': ['a']}))
+
 
 if __name__ == '__main__':
     unittest.main()
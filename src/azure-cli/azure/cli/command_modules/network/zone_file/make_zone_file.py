@@ -24,11 +24,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 # pylint: skip-file
-def make_zone_file(json_obj):
+def make_zone_file(json_obj, out=None):
     """
     Generate the DNS zonefile, given a json-encoded description of the
     zone file (@json_zone_file) and the template to fill in (@template)
 
+    If a writable text stream is given as @out the zone file is written to it
+    as it is generated and None is returned, otherwise it is returned as a string.
+
     json_zone_file = {
         "$origin": origin server,
         "$ttl":    default time-to-live,
@@ -49,7 +52,7 @@ def make_zone_file(json_obj):
     import azure.cli.command_modules.network.zone_file.record_processors as record_processors
     from io import StringIO
 
-    zone_file = StringIO()
+    zone_file = out if out is not None else StringIO()
 
     HEADER = """
 ; Exported zone file from Azure DNS\n\
@@ -96,6 +99,9 @@ $ORIGIN {origin}\n\
 
             print('', file=zone_file)
 
+    if out is not None:
+        return None
+
     result = zone_file.getvalue()
     zone_file.close()
 